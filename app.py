@@ -1,7 +1,9 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import asyncio
 import sys
+import time
 import traceback
 from datetime import datetime
 from http import HTTPStatus
@@ -12,15 +14,19 @@ from botbuilder.core import (
     BotFrameworkAdapter,
     BotFrameworkAdapterSettings,
     ConversationState,
-    MemoryStorage,
     TurnContext,
     UserState,
 )
 from botbuilder.core.integration import aiohttp_error_middleware
 from botbuilder.schema import Activity, ActivityTypes
 
-from bots import CustomPromptBot
+from bots import CustomPromptBot, NUMBER_RECOGNITION, Prefetch
 from config import DefaultConfig
+from data_models import sentiment
+import ingress
+from metrics import REGISTRY, StackSampler, TurnTimings, add_slow_turn_hook, log_slow_turn
+from scheduler import ConversationScheduler, Overloaded
+from storage import create_storage
 
 CONFIG = DefaultConfig()
 
@@ -65,37 +71,206 @@ async def on_error(context: TurnContext, error: Exception):
 # In this case, we want an unbound method, so MethodType is not needed.
 ADAPTER.on_turn_error = on_error
 
-# Create MemoryStorage and state
-MEMORY = MemoryStorage()
-USER_STATE = UserState(MEMORY)
-CONVERSATION_STATE = ConversationState(MEMORY)
+# Create storage (selected by DefaultConfig.STATE_STORAGE) and state
+STORAGE = create_storage(CONFIG)
+if hasattr(STORAGE, "collect_metrics"):
+    REGISTRY.add_collector(STORAGE.collect_metrics)
+USER_STATE = UserState(STORAGE)
+CONVERSATION_STATE = ConversationState(STORAGE)
 
 # Create Bot
 BOT = CustomPromptBot(CONVERSATION_STATE, USER_STATE)
 
 
+# Serializes turns per conversation and bounds the work in flight.
+SCHEDULER = ConversationScheduler(
+    CONFIG.SCHEDULER_MAX_CONCURRENCY,
+    CONFIG.SCHEDULER_MAX_QUEUE,
+    CONFIG.SCHEDULER_MAX_PER_CONVERSATION,
+    CONFIG.SCHEDULER_RETRY_AFTER,
+)
+REGISTRY.add_collector(SCHEDULER.collect_metrics)
+
+
+# Slow turns are logged with their stage breakdown, optionally with stack samples.
+SLOW_TURN_SECONDS = CONFIG.METRICS_SLOW_TURN_MS / 1000
+add_slow_turn_hook(log_slow_turn)
+SAMPLER = None
+if CONFIG.METRICS_SAMPLE_INTERVAL_MS:
+    SAMPLER = StackSampler(CONFIG.METRICS_SAMPLE_INTERVAL_MS / 1000)
+    add_slow_turn_hook(SAMPLER.hook)
+
+
 # Listen for incoming requests on /api/messages.
 async def messages(req: Request) -> Response:
     # Main bot message handler.
-    if "application/json" in req.headers["Content-Type"]:
-        body = await req.json()
-    else:
-        return Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+    timings = TurnTimings()
+    try:
+        with timings.stage("parse"):
+            if req.content_type != "application/json":
+                return Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+            # Bodies over MaxRequestBytes are refused with 413 while reading.
+            try:
+                body = ingress.decode(await req.read())
+            except ValueError:
+                return Response(status=HTTPStatus.BAD_REQUEST)
+
+            # Typing, conversationUpdate and the like need no turn at all.
+            if ingress.is_trivial(body):
+                REGISTRY.increment("bot_ingress_skipped_total")
+                if CONFIG.PREFETCH:
+                    BOT.prefetcher.warm(ingress.conversation_key(body), body["type"])
+                return Response(status=HTTPStatus.OK)
+
+            activity = Activity().deserialize(body)
+
+        auth_header = req.headers["Authorization"] if "Authorization" in req.headers else ""
+
+        # Everything between handing the activity to the adapter and the bot
+        # starting the turn (mostly authentication) is the "auth" stage.
+        auth_start = 0.0
+        prefetch = None
+
+        async def on_turn(turn_context: TurnContext):
+            timings.stage("auth").record(time.perf_counter() - auth_start)
+            turn_context.turn_state[TurnTimings.KEY] = timings
+            if prefetch is not None:
+                turn_context.turn_state[Prefetch.KEY] = prefetch
+            await BOT.on_turn(turn_context)
 
-    activity = Activity().deserialize(body)
-    auth_header = req.headers["Authorization"] if "Authorization" in req.headers else ""
+        async def process():
+            nonlocal auth_start, prefetch
+            # Once admitted, start the analysis this message will need so it
+            # runs in parallel with auth and state loading. Rejected requests
+            # never reach this point and cost no analysis call.
+            if CONFIG.PREFETCH:
+                prefetch = BOT.prefetcher.start(activity)
+            auth_start = time.perf_counter()
+            return await ADAPTER.process_activity(activity, auth_header, on_turn)
+
+        # Turns that arrive during a background warm-up wait for it rather
+        # than build the number recognizer on the event loop.
+        if WARM_UP_TASK is not None and not WARM_UP_TASK.done():
+            with timings.stage("warm_up"):
+                await asyncio.shield(WARM_UP_TASK)
+
+        conversation = activity.conversation
+        key = (activity.channel_id, conversation.id) if conversation else None
+        try:
+            response = await SCHEDULER.run(key, process, timings)
+        except Overloaded as error:
+            return Response(
+                status=error.status, headers={"Retry-After": str(error.retry_after)}
+            )
+    finally:
+        timings.finish(SLOW_TURN_SECONDS)
 
-    response = await ADAPTER.process_activity(activity, auth_header, BOT.on_turn)
     if response:
         return json_response(data=response.body, status=response.status)
     return Response(status=HTTPStatus.OK)
 
 
-APP = web.Application(middlewares=[aiohttp_error_middleware])
+# Prometheus scrape endpoint.
+async def scrape_metrics(req: Request) -> Response:
+    return Response(
+        text=REGISTRY.render(), content_type="text/plain", charset="utf-8"
+    )
+
+
+# Set once startup has warmed everything up, cleared as soon as shutdown begins.
+READY = False
+
+
+# Liveness: the process is up and its event loop is responding.
+async def healthz(req: Request) -> Response:
+    return Response(text="ok")
+
+
+# Readiness: warmed up and not draining, so the gateway may route turns here.
+async def readyz(req: Request) -> Response:
+    if READY:
+        return Response(text="ready")
+    return Response(status=HTTPStatus.SERVICE_UNAVAILABLE, text="not ready")
+
+
+APP = web.Application(
+    middlewares=[aiohttp_error_middleware], client_max_size=CONFIG.MAX_REQUEST_BYTES
+)
 APP.router.add_post("/api/messages", messages)
+APP.router.add_get("/metrics", scrape_metrics)
+APP.router.add_get("/healthz", healthz)
+APP.router.add_get("/readyz", readyz)
+
+
+def warm_up():
+    # Build the number recognizer and the analysis client before the first
+    # AGE/MOOD/RELATIVE turn needs them.
+    NUMBER_RECOGNITION.warm_up()
+    sentiment.warm_up()
+
+
+WARM_UP_TASK = None
+
+
+async def warm_up_in_background():
+    global READY
+    try:
+        # The recognizer model is pure Python; building it in a thread keeps
+        # the loop free to answer health checks meanwhile.
+        await asyncio.get_event_loop().run_in_executor(None, NUMBER_RECOGNITION.warm_up)
+        sentiment.warm_up()
+    except Exception:  # pylint: disable=broad-except
+        # Turns build whatever is missing on first use.
+        print("\n [warm_up] failed", file=sys.stderr)
+        traceback.print_exc()
+    READY = True
+
+
+async def on_startup(app: web.Application):
+    # on_startup finishes before the listening socket accepts anything. By
+    # default the worker only accepts once warm; with StartupWarmUp=background
+    # it accepts at once and /readyz turns 200 when the warm-up ends.
+    global READY, WARM_UP_TASK
+    if SAMPLER is not None:
+        SAMPLER.start()
+    if CONFIG.STARTUP_WARM_UP == "blocking":
+        warm_up()
+        READY = True
+    else:
+        WARM_UP_TASK = asyncio.ensure_future(warm_up_in_background())
+
+
+APP.on_startup.append(on_startup)
+
+
+async def on_shutdown(app: web.Application):
+    global READY
+    if WARM_UP_TASK is not None:
+        WARM_UP_TASK.cancel()
+    READY = False
+
+
+APP.on_shutdown.append(on_shutdown)
+
+
+async def on_cleanup(app: web.Application):
+    if SAMPLER is not None:
+        SAMPLER.stop()
+    # Release the shared text analytics HTTP session and storage connections.
+    await sentiment.close()
+    if hasattr(STORAGE, "close"):
+        await STORAGE.close()
+
+
+APP.on_cleanup.append(on_cleanup)
 
 if __name__ == "__main__":
     try:
-        web.run_app(APP, host="localhost", port=CONFIG.PORT)
+        web.run_app(
+            APP,
+            host=CONFIG.HOST,
+            port=CONFIG.PORT,
+            shutdown_timeout=CONFIG.SHUTDOWN_TIMEOUT,
+        )
     except Exception as error:
         raise error
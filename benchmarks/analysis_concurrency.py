@@ -0,0 +1,80 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Show that concurrent senti()/ner() calls overlap instead of serializing and
+are coalesced into multi-document requests.
+
+    python -m benchmarks.analysis_concurrency --turns 50 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_services import FakeTextAnalytics
+
+
+async def run(turns: int, latency: float, local: bool):
+    service = FakeTextAnalytics(latency=latency)
+    await service.start()
+
+    from data_models import analysis_client, sentiment
+
+    analysis_client.CONFIG.ANALYSIS_ENDPOINT = service.endpoint
+    if not local:
+        # Every text below is one the lexicon analyzer would answer by itself.
+        sentiment.CONFIG.ANALYSIS_LOCAL_MIN_CONFIDENCE = 2.0
+    try:
+        # Every tenth turn is blank, which the service rejects per document.
+        # The rest are unique so the result cache does not hide the service.
+        calls = [
+            (sentiment.senti if i % 2 else sentiment.ner)(
+                "" if i % 10 == 9 else (f"今天很开心{i}" if i % 2 else f"我妈妈{i}")
+            )
+            for i in range(turns)
+        ]
+        start = time.perf_counter()
+        results = await asyncio.gather(*calls)
+        elapsed = time.perf_counter() - start
+    finally:
+        await sentiment.close()
+        await service.stop()
+
+    failed = sum(1 for result in results if not any(result.values()))
+    print(f"turns:              {turns}")
+    print(f"injected latency:   {latency * 1000:.0f} ms")
+    print(f"serialized (est.):  {turns * latency:.2f} s")
+    print(f"concurrent (meas.): {elapsed:.2f} s")
+    print(f"speedup:            {turns * latency / elapsed:.1f}x")
+    print(f"empty results:      {failed}")
+    print(f"service requests:   {service.requests} for {service.documents} documents")
+    print(f"cache:              {sentiment.CACHE.stats.as_dict()}")
+    for name, batcher in (
+        ("sentiment", sentiment.SENTIMENT_BATCHER),
+        ("entities", sentiment.ENTITY_BATCHER),
+    ):
+        stats = batcher.stats
+        print(
+            f"{name + ' batches:':20}{stats.batches} "
+            f"(mean size {stats.mean_batch_size:.1f}, max {stats.max_batch_size}, "
+            f"mean wait {stats.mean_wait * 1000:.1f} ms, "
+            f"max wait {stats.max_wait * 1000:.1f} ms)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument(
+        "--local", action="store_true", help="let the in-process analyzer answer first"
+    )
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(run(args.turns, args.latency, args.local))
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
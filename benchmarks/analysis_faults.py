@@ -0,0 +1,145 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Drive senti() through injected service faults and check that turns degrade
+instead of failing: throttling is retried, a stalled service is cut off at
+the deadline, the circuit breaker opens and later closes again.
+
+    python -m benchmarks.analysis_faults
+
+Exits non-zero if any scenario does not behave as expected.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.fake_services import FakeTextAnalytics
+
+# Short enough that the whole run takes a few seconds.
+SETTINGS = {
+    "AnalysisAttemptTimeout": "0.3",
+    "AnalysisTimeout": "1.0",
+    "AnalysisBreakerThreshold": "3",
+    "AnalysisBreakerReset": "1.0",
+    "AnalysisRetries": "4",
+    "AnalysisBackoffBaseMs": "20",
+    # Send every text to the service; the lexicon would answer these itself.
+    "AnalysisLocalMinConfidence": "2.0",
+}
+
+
+def sources(registry) -> dict:
+    counts = {}
+    for (name, labels), value in registry.counters.items():
+        if name == "analysis_requests_total" and 'kind="sentiment"' in labels:
+            source = labels.split('source="')[1].split('"')[0]
+            counts[source] = value
+    return counts
+
+
+async def turns(sentiment, tag: str, count: int, sequential: bool = False):
+    async def one(index):
+        start = time.perf_counter()
+        await sentiment.senti(f"今天很开心{tag}{index}")
+        return time.perf_counter() - start
+
+    if sequential:
+        return [await one(index) for index in range(count)]
+    return await asyncio.gather(*[one(index) for index in range(count)])
+
+
+async def run() -> bool:
+    service = FakeTextAnalytics(latency=0.01)
+    await service.start()
+
+    from data_models import analysis_client, sentiment
+    from metrics import REGISTRY
+
+    analysis_client.CONFIG.ANALYSIS_ENDPOINT = service.endpoint
+    breaker = sentiment.BREAKER
+
+    async def scenario(name, tag, count, check, sequential=False):
+        before = sources(REGISTRY)
+        retries = sentiment.RETRY.stats.retries
+        latencies = await turns(sentiment, tag, count, sequential)
+        after = sources(REGISTRY)
+        result = {
+            "service": after.get("service", 0) - before.get("service", 0),
+            "fallback": after.get("fallback", 0) - before.get("fallback", 0),
+            "retries": sentiment.RETRY.stats.retries - retries,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "max_ms": max(latencies) * 1000,
+            "breaker": breaker.state,
+        }
+        passed = check(result)
+        print(
+            f"{name:14} service {result['service']:3.0f}  fallback {result['fallback']:3.0f}  "
+            f"retries {result['retries']:3}  p50 {result['p50_ms']:7.1f} ms  "
+            f"max {result['max_ms']:7.1f} ms  breaker {result['breaker']:9}  "
+            f"{'ok' if passed else 'FAIL'}"
+        )
+        return passed
+
+    try:
+        results = [
+            await scenario(
+                "healthy", "a", 20,
+                lambda r: r["service"] == 20 and r["breaker"] == "closed",
+            ),
+        ]
+
+        service.inject(429, rate=0.5, retry_after=0.05)
+        results.append(
+            await scenario(
+                "throttled", "b", 20,
+                lambda r: r["service"] == 20 and r["retries"] > 0 and r["max_ms"] < 1000,
+                sequential=True,
+            )
+        )
+
+        service.inject(status=0, delay=2.0)
+        results.append(
+            await scenario(
+                "stalled", "c", 3,
+                lambda r: r["fallback"] == 3 and r["max_ms"] < 1200 and r["breaker"] == "open",
+                sequential=True,
+            )
+        )
+        results.append(
+            await scenario(
+                "breaker open", "d", 20,
+                lambda r: r["fallback"] == 20 and r["max_ms"] < 50,
+            )
+        )
+
+        service.clear_faults()
+        await asyncio.sleep(sentiment.CONFIG.ANALYSIS_BREAKER_RESET)
+        results.append(
+            await scenario(
+                "recovered", "e", 5,
+                lambda r: r["service"] == 5 and r["breaker"] == "closed",
+                sequential=True,
+            )
+        )
+        print(f"service requests: {service.requests}, injected faults: {service.faults}")
+        return all(results)
+    finally:
+        await sentiment.close()
+        await service.stop()
+
+
+def main():
+    os.environ.update(SETTINGS)
+    loop = asyncio.new_event_loop()
+    try:
+        passed = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
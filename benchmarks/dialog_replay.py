@@ -0,0 +1,133 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Replay scripted NAME -> AGE -> MOOD -> RELATIVE conversations through the
+compiled dialog and check every reply, using the in-process lexicon analyzer.
+
+    python -m benchmarks.dialog_replay
+
+Together the scripts take every outcome in DIALOG: invalid NAME, AGE and
+RELATIVE answers, an AGE without a value, both AGE branches, all three MOOD
+labels, a MOOD answer the analyzer cannot read, and the restart after
+RELATIVE. Exits non-zero if any reply differs.
+"""
+
+import asyncio
+import os
+import sys
+
+ASK_NAME = ["Hi, 本来想问你好吗？但是还是算了吧。", "要不我来直接学习你吧😉", "我该怎么称呼你呀？"]
+ASK_AGE = ["你可以叫我iki，或者任何你想叫的名字~", "你今年几岁了?"]
+ASK_RELATIVE = "那么你最喜欢的一位亲人是谁呢？"
+
+SCRIPTS = {
+    "age >= 30, invalid mood": [
+        ("hi", ASK_NAME),
+        ("阿丁", ["很高兴认识你， 阿丁。"] + ASK_AGE),
+        (
+            "三十岁",
+            ["30岁的年纪，你一定有很多故事可以和我分享吧。", "阿丁今天过的怎么样？能跟我聊聊吗？是开心的一天吗？"],
+        ),
+        (
+            "今天去了公园然后看了电影",
+            ["这对我暂时还有点难😣", "不如我们换个话题吧。", "阿丁喜欢收礼物吗？有没有收到过来自家人印象特别深刻的礼物？"],
+        ),
+        ("是我表哥", ["哇，这一定是你很珍惜的礼物吧！", "表哥是你最喜欢的家人吗？"]),
+    ],
+    "age < 30, positive mood": [
+        ("hi", ASK_NAME),
+        ("小红", ["很高兴认识你， 小红。"] + ASK_AGE),
+        (
+            "二十五",
+            ["25岁的年纪，你的人生才刚刚开始呢。", "小红今天过的怎么样？能跟我聊聊吗？是开心的一天吗？"],
+        ),
+        (
+            "开心",
+            [
+                "哇！听上去真好。很高兴能听到你这么说😊。",
+                "一般有些什么事会让你觉得开心呢？",
+                "对我来说，收到礼物最让我开心了！",
+                "你有没有收到过来自家人印象特别深的礼物？",
+            ],
+        ),
+        ("我妈", ["哇，这一定是你很珍惜的礼物吧！", "妈妈是你最喜欢的家人吗？"]),
+    ],
+    "invalid answers, no age, negative mood, restart": [
+        ("hi", ASK_NAME),
+        ("", ["请至少输入一个字符。"]),
+        ("小明", ["很高兴认识你， 小明。"] + ASK_AGE),
+        ("200", ["要输入真实年龄(1-100之间)才能让我更好的了解你哦。"]),
+        (
+            "不告诉你",
+            ["年龄只是一个数字，你不想说也可以😌", "小明今天过的怎么样？能跟我聊聊吗？是开心的一天吗？"],
+        ),
+        (
+            "不开心",
+            [
+                "真遗憾听到你这么说😔。",
+                "不过有我在，我会一直陪着你的😌。",
+                "不如让我们说说开心的事吧！",
+                "对我来说，收到礼物最让我开心了！",
+                "小明喜欢收礼物吗？有没有收到过来自家人印象特别深的礼物？",
+            ],
+        ),
+        ("没有", [ASK_RELATIVE]),
+        ("爸爸", ["哇，这一定是你很珍惜的礼物吧！", "爸爸是你最喜欢的家人吗？"]),
+        ("hi", ASK_NAME),
+    ],
+    "neutral mood": [
+        ("hi", ASK_NAME),
+        ("小李", ["很高兴认识你， 小李。"] + ASK_AGE),
+        (
+            "四十五",
+            ["45岁的年纪，你一定有很多故事可以和我分享吧。", "小李今天过的怎么样？能跟我聊聊吗？是开心的一天吗？"],
+        ),
+        (
+            "还好",
+            [
+                "我明白，有时候确实也不知道怎么描述自己的心情。不如我们换个话题吧！",
+                "小李喜欢收礼物吗？有没有收到过来自家人印象特别深刻的礼物？",
+            ],
+        ),
+        ("外婆送的", ["哇，这一定是你很珍惜的礼物吧！", "外婆是你最喜欢的家人吗？"]),
+    ],
+}
+
+
+async def run() -> int:
+    # Imported only now: configuration is read when these modules load.
+    from botbuilder.core import ConversationState, MemoryStorage, UserState
+
+    from bots import CustomPromptBot
+    from bots.conversation_engine import ReplayMismatch, replay
+    from data_models import sentiment
+
+    storage = MemoryStorage()
+    bot = CustomPromptBot(ConversationState(storage), UserState(storage))
+    failures = 0
+    try:
+        for name, script in SCRIPTS.items():
+            try:
+                await replay(bot.engine, script)
+                print(f"{name}: ok")
+            except ReplayMismatch as error:
+                failures += 1
+                print(f"{name}: FAIL {error}")
+    finally:
+        await sentiment.close()
+    return failures
+
+
+def main():
+    # Every local answer counts as confident, so nothing leaves the process.
+    os.environ["AnalysisLocalMinConfidence"] = "0"
+    loop = asyncio.new_event_loop()
+    try:
+        failures = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Local stand-ins for the remote services the bot talks to."""
+
+import asyncio
+import random
+
+from aiohttp import web
+
+POSITIVE_WORDS = ["开心", "高兴", "不错", "很好", "快乐"]
+NEGATIVE_WORDS = ["难过", "伤心", "不好", "糟糕", "累"]
+PERSON_TYPES = ["妈妈", "爸爸", "奶奶", "爷爷", "外婆", "外公", "姐姐", "哥哥", "妹妹", "弟弟"]
+
+
+class LocalServer:
+    """An aiohttp application served on a free localhost port."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.port = None
+        self.app = web.Application()
+        self._runner = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FakeConnector(LocalServer):
+    """A Bot Framework channel connector that accepts and counts replies."""
+
+    def __init__(self, latency: float = 0.0):
+        super(FakeConnector, self).__init__(latency)
+        self.activities = 0
+        self.app.router.add_post(
+            "/v3/conversations/{conversation_id}/activities", self._reply
+        )
+        self.app.router.add_post(
+            "/v3/conversations/{conversation_id}/activities/{activity_id}", self._reply
+        )
+
+    async def _reply(self, request):
+        await request.read()
+        self.requests += 1
+        self.activities += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"id": str(self.activities)})
+
+
+class FakeTextAnalytics(LocalServer):
+    """A text analytics v3.0 endpoint with injectable latency and faults.
+
+    Sentiment is decided by a handful of keywords and entities are any of
+    ``PERSON_TYPES`` found in the text, which is enough to drive the bot flow.
+    """
+
+    def __init__(self, latency: float = 0.0, seed: int = 0):
+        super(FakeTextAnalytics, self).__init__(latency)
+        self.documents = 0
+        self.faults = 0
+        self._fault = None
+        self._random = random.Random(seed)
+        self.app.router.add_post("/text/analytics/v3.0/sentiment", self._sentiment)
+        self.app.router.add_post(
+            "/text/analytics/v3.0/entities/recognition/general", self._entities
+        )
+
+    def inject(self, status: int = 503, rate: float = 1.0, retry_after: float = None, delay: float = 0.0):
+        """Answer a `rate` share of requests with `status` (plus Retry-After
+        seconds if given) after `delay` seconds. A status of 0 leaves the
+        answer alone and only adds the delay, to simulate a stalled service."""
+        self._fault = (status, rate, retry_after, delay)
+
+    def clear_faults(self):
+        self._fault = None
+
+    async def _faulted(self):
+        if self._fault is None:
+            return None
+        status, rate, retry_after, delay = self._fault
+        if self._random.random() >= rate:
+            return None
+        self.faults += 1
+        if delay:
+            await asyncio.sleep(delay)
+        if not status:
+            return None
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        return web.json_response(
+            {"error": {"code": "InjectedFault", "message": f"Injected HTTP {status}."}},
+            status=status,
+            headers=headers,
+        )
+
+    async def _read(self, request):
+        body = await request.json()
+        self.requests += 1
+        self.documents += len(body["documents"])
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return body["documents"]
+
+    async def _sentiment(self, request):
+        documents = await self._read(request)
+        fault = await self._faulted()
+        if fault is not None:
+            return fault
+        return web.json_response(self._response(documents, self._sentiment_doc))
+
+    async def _entities(self, request):
+        documents = await self._read(request)
+        fault = await self._faulted()
+        if fault is not None:
+            return fault
+        return web.json_response(self._response(documents, self._entities_doc))
+
+    @staticmethod
+    def _response(documents, analyze):
+        # Blank documents are rejected per document, like the real service does,
+        # so callers can check that partial errors reach the right conversation.
+        results, errors = [], []
+        for doc in documents:
+            if doc["text"].strip():
+                results.append(analyze(doc))
+            else:
+                message = "Document text is empty."
+                errors.append(
+                    {
+                        "id": doc["id"],
+                        "error": {
+                            "code": "InvalidArgument",
+                            "message": message,
+                            "innererror": {"code": "InvalidDocument", "message": message},
+                        },
+                    }
+                )
+        return {"documents": results, "errors": errors, "modelVersion": "2020-04-01"}
+
+    @staticmethod
+    def _sentiment_doc(doc):
+        text = doc["text"]
+        if any(word in text for word in NEGATIVE_WORDS):
+            label = "negative"
+        elif any(word in text for word in POSITIVE_WORDS):
+            label = "positive"
+        else:
+            label = "neutral"
+        scores = {"positive": 0.0, "neutral": 0.0, "negative": 0.0}
+        scores[label] = 1.0
+        return {
+            "id": doc["id"],
+            "sentiment": label,
+            "confidenceScores": scores,
+            "sentences": [
+                {
+                    "sentiment": label,
+                    "confidenceScores": scores,
+                    "offset": 0,
+                    "length": len(text),
+                    "text": text,
+                }
+            ],
+            "warnings": [],
+        }
+
+    @staticmethod
+    def _entities_doc(doc):
+        text = doc["text"]
+        entities = []
+        for person in PERSON_TYPES:
+            offset = text.find(person)
+            if offset < 0:
+                continue
+            start = offset - 1 if offset > 0 and text[offset - 1] == "我" else offset
+            end = offset + len(person)
+            entities.append(
+                {
+                    "text": text[start:end],
+                    "category": "PersonType",
+                    "offset": start,
+                    "length": end - start,
+                    "confidenceScore": 0.9,
+                }
+            )
+        return {"id": doc["id"], "entities": entities, "warnings": []}
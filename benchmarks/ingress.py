@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Compare the per-request parse cost of /api/messages before and after the
+ingress fast path, on a mix of messages and typing/conversationUpdate traffic.
+
+    python -m benchmarks.ingress --requests 20000 --trivial-share 0.5
+"""
+
+import argparse
+import json
+import time
+
+from botbuilder.schema import Activity
+
+import ingress
+from benchmarks.load_test import activity
+
+SERVICE_URL = "https://smba.trafficmanager.net/apis/"
+
+
+def bodies(count: int, trivial_share: float) -> list:
+    result = []
+    trivial_every = int(1 / trivial_share) if trivial_share else 0
+    for index in range(count):
+        body = activity(index % 500, index, "我今年二十五岁了", SERVICE_URL)
+        if trivial_every and index % trivial_every == 0:
+            body = dict(body, type="typing" if index % 2 else "conversationUpdate")
+            body.pop("text")
+            if body["type"] == "conversationUpdate":
+                body["membersAdded"] = [{"id": body["from"]["id"], "name": "user"}]
+        result.append(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+    return result
+
+
+def before(data: bytes):
+    return Activity().deserialize(json.loads(data))
+
+
+def after(data: bytes):
+    body = ingress.decode(data)
+    if ingress.is_trivial(body):
+        return body
+    return Activity().deserialize(body)
+
+
+def timed(function, payloads: list) -> float:
+    start = time.perf_counter()
+    for data in payloads:
+        function(data)
+    return (time.perf_counter() - start) / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--trivial-share", type=float, default=0.5)
+    args = parser.parse_args()
+
+    payloads = bodies(args.requests, args.trivial_share)
+    trivial = sum(ingress.is_trivial(ingress.decode(data)) for data in payloads)
+
+    rows = [
+        ("json.loads", timed(json.loads, payloads)),
+        (f"ingress.decode ({ingress.DECODER})", timed(ingress.decode, payloads)),
+        ("json.loads + deserialize (before)", timed(before, payloads)),
+        ("decode + pre-screen (after)", timed(after, payloads)),
+    ]
+    print(f"{args.requests} requests, {trivial} trivial, {len(payloads[0])} bytes each")
+    for name, seconds in rows:
+        print(f"{name:36} {seconds * 1e6:8.1f} us/request {1 / seconds:12,.0f} requests/s")
+
+
+if __name__ == "__main__":
+    main()
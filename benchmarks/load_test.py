@@ -0,0 +1,195 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Drive simulated conversations through the full /api/messages pipeline.
+
+Each conversation walks NAME -> AGE -> MOOD -> RELATIVE against app.APP
+served on localhost, with stubs for the channel connector and the text
+analytics service. Reports turn latency percentiles, throughput and memory
+per conversation, and can save or compare against a baseline:
+
+    python -m benchmarks.load_test --conversations 500 --concurrency 50 \\
+        --save-baseline baseline.json
+    python -m benchmarks.load_test --conversations 500 --concurrency 50 \\
+        --compare baseline.json --tolerance 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+
+from benchmarks.fake_services import FakeConnector, FakeTextAnalytics
+
+NAMES = ["小明", "小红", "老王", "阿丁", "甜甜"]
+AGES = ["25", "十八", "我今年四十二岁了", "三十岁", "不告诉你"]
+# A mix the local analyzer answers and ones that need the service.
+MOODS = ["开心", "不开心", "还好", "今天去了公园然后看了电影", "说不清楚"]
+RELATIVES = ["我妈妈", "奶奶", "外公送的", "是我表哥", "一个朋友"]
+
+# Metrics compared by --compare, and whether bigger is better.
+GATED = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "turns_per_second": True}
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # ru_maxrss is a high-water mark (KiB on Linux), good enough elsewhere.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def script(index: int) -> list:
+    return [
+        "hi",
+        NAMES[index % len(NAMES)],
+        AGES[index % len(AGES)],
+        MOODS[index % len(MOODS)],
+        RELATIVES[index % len(RELATIVES)],
+    ]
+
+
+def activity(index: int, turn: int, text: str, service_url: str) -> dict:
+    return {
+        "type": "message",
+        "id": f"{index}-{turn}",
+        "channelId": "loadtest",
+        "serviceUrl": service_url,
+        "conversation": {"id": f"conversation-{index}"},
+        "from": {"id": f"user-{index}", "name": "user"},
+        "recipient": {"id": "bot", "name": "iki"},
+        "text": text,
+        "locale": "zh-CN",
+    }
+
+
+async def converse(session, url, service_url, index, latencies, failures):
+    for turn, text in enumerate(script(index)):
+        start = time.perf_counter()
+        async with session.post(url, json=activity(index, turn, text, service_url)) as response:
+            await response.read()
+            if response.status >= 400:
+                failures.append(response.status)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(args) -> dict:
+    connector = FakeConnector(latency=args.connector_latency)
+    analytics = FakeTextAnalytics(latency=args.analysis_latency)
+    await connector.start()
+    await analytics.start()
+
+    # Unauthenticated, like the emulator, and pointed at the stubs. The app is
+    # imported only now because its configuration is read at import time.
+    os.environ["MicrosoftAppId"] = ""
+    os.environ["MicrosoftAppPassword"] = ""
+    os.environ["AnalysisEndpoint"] = analytics.endpoint
+    from aiohttp import web
+    import app
+
+    runner = web.AppRunner(app.APP)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/api/messages"
+
+    latencies, failures = [], []
+    rss_before = rss_bytes()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(session, index):
+        async with semaphore:
+            await converse(session, url, connector.endpoint, index, latencies, failures)
+
+    connector_limit = aiohttp.TCPConnector(limit=args.concurrency)
+    try:
+        async with aiohttp.ClientSession(connector=connector_limit) as session:
+            start = time.perf_counter()
+            await asyncio.gather(*[limited(session, i) for i in range(args.conversations)])
+            elapsed = time.perf_counter() - start
+    finally:
+        rss_after = rss_bytes()
+        await runner.cleanup()
+        await connector.stop()
+        await analytics.stop()
+
+    return {
+        "conversations": args.conversations,
+        "concurrency": args.concurrency,
+        "turns": len(latencies),
+        "failures": len(failures),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "turns_per_second": len(latencies) / elapsed,
+        "bytes_per_conversation": max(0, rss_after - rss_before) / args.conversations,
+        "connector_activities": connector.activities,
+        "analysis_requests": analytics.requests,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for metric, higher_is_better in GATED.items():
+        current, previous = result[metric], baseline[metric]
+        if higher_is_better:
+            regressed = current < previous * (1 - tolerance)
+        else:
+            regressed = current > previous * (1 + tolerance)
+        if regressed:
+            regressions.append(f"{metric}: {previous:.2f} -> {current:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--connector-latency", type=float, default=0.02)
+    parser.add_argument("--analysis-latency", type=float, default=0.1)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    result = loop.run_until_complete(run(args))
+    loop.close()
+
+    for key, value in result.items():
+        print(f"{key:24}{value:12.2f}" if isinstance(value, float) else f"{key:24}{value:12d}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(result, baseline_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(result, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print("regressions against baseline:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Check the lexicon analyzer's answers on inputs that are easy to get wrong,
+such as words that merely contain a negator character (特别, 未来) or a
+kinship term (徒弟, 小姐姐).
+
+    python -m benchmarks.local_analyzer_check
+
+An expected answer of None means the analyzer must defer to the service, that
+is, answer below the default AnalysisLocalMinConfidence. Exits non-zero if any
+answer is wrong.
+"""
+
+import sys
+
+from config import DefaultConfig
+from data_models.local_analyzer import LexiconAnalyzer
+
+SENTIMENT = [
+    ("今天特别开心", "positive"),
+    ("未来很美好", "positive"),
+    ("今天过得特别糟糕", "negative"),
+    ("区别不大，挺好的", "positive"),
+    ("今天不开心", "negative"),
+    ("我不是很开心", "negative"),
+    ("没有很开心", "negative"),
+    ("特别不开心", "negative"),
+    ("不是不开心", "positive"),
+    ("还好吧", "neutral"),
+    ("差不多吧", "neutral"),
+    ("开心不起来", "negative"),
+    ("高兴不起来", "negative"),
+    ("别提多开心了", None),
+]
+PERSON_TYPE = [
+    ("我妈", "妈妈"),
+    ("妈", "妈妈"),
+    ("是我表哥", "表哥"),
+    ("外公送的", "外公"),
+    ("他妈的忘了", None),
+    ("我徒弟", None),
+    ("哥们送的", None),
+    ("我兄弟", None),
+    ("小姐姐", None),
+    ("我哥送的", None),
+]
+
+
+def main():
+    analyzer = LexiconAnalyzer()
+    min_confidence = DefaultConfig.ANALYSIS_LOCAL_MIN_CONFIDENCE
+    failures = 0
+    for analyze, key, cases in (
+        (analyzer.senti, "sentiment", SENTIMENT),
+        (analyzer.ner, "person_type", PERSON_TYPE),
+    ):
+        for text, expected in cases:
+            analysis = analyze(text)
+            answer = analysis.result.get(key) if analysis.confidence >= min_confidence else None
+            passed = answer == expected
+            failures += not passed
+            print(
+                f"{text:12} expected {str(expected):8} got {str(answer):8} "
+                f"confidence {analysis.confidence:.2f}  {'ok' if passed else 'FAIL'}"
+            )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
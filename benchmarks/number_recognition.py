@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Compare per-turn recognize_number() against the shared NumberRecognition.
+
+    python -m benchmarks.number_recognition --repeat 200
+"""
+
+import argparse
+import time
+
+from recognizers_number import Culture, recognize_number
+
+from bots.number_recognition import NumberRecognition
+
+AGE_REPLIES = ["25", "十八", "二十五", "三十岁", "我今年四十二岁了", "二十五六", "不告诉你", "大概35吧"]
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for reply in AGE_REPLIES:
+            function(reply)
+    return (time.perf_counter() - start) / (repeat * len(AGE_REPLIES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    # Building the model and compiling its regexes is what the first AGE turn
+    # after a deploy used to pay; NumberRecognition pays it at startup instead.
+    recognition = NumberRecognition(Culture.Chinese)
+    start = time.perf_counter()
+    recognition.warm_up()
+    warm_up = time.perf_counter() - start
+
+    start = time.perf_counter()
+    recognition.recognize(AGE_REPLIES[-1])
+    first_turn = time.perf_counter() - start
+
+    current = timed(lambda text: recognize_number(text, Culture.Chinese), args.repeat)
+    uncached = timed(recognition._recognize, args.repeat)
+    cached = timed(recognition.recognize, args.repeat)
+
+    print(f"cold model build (warm_up):      {warm_up * 1000:8.2f} ms")
+    print(f"first AGE turn after warm-up:    {first_turn * 1000:8.2f} ms")
+    print(f"recognize_number() per turn:     {current * 1e6:8.1f} us")
+    print(f"fast path + shared model:        {uncached * 1e6:8.1f} us")
+    print(f"memoized:                        {cached * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Boot app.py and measure how long until it accepts requests and is ready.
+
+Reports, per run and as medians: time until the first accepted request
+(GET /healthz answers), time until GET /readyz returns 200 (warm-up done)
+and the process's peak RSS at that point (VmHWM, Linux only).
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --warm-up background
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return 0
+
+
+def peak_rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def boot(warm_up: str, timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        Host="127.0.0.1",
+        Port=str(port),
+        StartupWarmUp=warm_up,
+        MicrosoftAppId="",
+        MicrosoftAppPassword="",
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "app.py"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    result = {}
+    try:
+        deadline = start + timeout
+        while "accepted" not in result or "ready" not in result:
+            if time.perf_counter() > deadline or process.poll() is not None:
+                raise RuntimeError(f"app.py did not become ready (exit code {process.poll()})")
+            if "accepted" not in result:
+                if status(base + "/healthz") == 200:
+                    result["accepted"] = time.perf_counter() - start
+                else:
+                    time.sleep(0.005)
+                    continue
+            if status(base + "/readyz") == 200:
+                result["ready"] = time.perf_counter() - start
+            else:
+                time.sleep(0.005)
+        result["peak_rss_mb"] = peak_rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", choices=("background", "blocking"), default="blocking")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    runs = []
+    for index in range(args.runs):
+        result = boot(args.warm_up, args.timeout)
+        runs.append(result)
+        print(
+            f"run {index + 1}: accepted {result['accepted'] * 1000:7.1f} ms  "
+            f"ready {result['ready'] * 1000:7.1f} ms  "
+            f"peak RSS {result['peak_rss_mb']:6.1f} MB"
+        )
+
+    print(f"{'time_to_first_request_ms':24} {statistics.median(r['accepted'] for r in runs) * 1000:10.1f}")
+    print(f"{'time_to_ready_ms':24} {statistics.median(r['ready'] for r in runs) * 1000:10.1f}")
+    print(f"{'peak_rss_mb':24} {statistics.median(r['peak_rss_mb'] for r in runs):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Bytes per stored record and encode/decode cost per turn, jsonpickle vs the
+compact state format.
+
+    python -m benchmarks.state_serialization --users 1000000
+"""
+
+import argparse
+import time
+
+import jsonpickle
+
+from data_models import ConversationFlow, Question, UserProfile
+from data_models.serialization import decode_state, encode_state
+
+RECORDS = {
+    "user": {"UserProfile": UserProfile("小明", 25, "positive", "妈妈")},
+    "conversation": {"ConversationFlow": ConversationFlow(Question.RELATIVE)},
+}
+
+
+def per_call(function, argument, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(argument)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    formats = (("jsonpickle", jsonpickle.encode, jsonpickle.decode), ("compact", encode_state, decode_state))
+    totals = {name: [0, 0.0] for name, _, _ in formats}
+
+    print(f"{'record':14}{'format':12}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    for record_name, record in RECORDS.items():
+        for name, encode, decode in formats:
+            data = encode(record)
+            size = len(data.encode("utf-8"))
+            encode_time = per_call(encode, record, args.repeat)
+            decode_time = per_call(decode, data, args.repeat)
+            # Every turn reads and (usually) writes both records.
+            totals[name][0] += size
+            totals[name][1] += encode_time + decode_time
+            print(
+                f"{record_name:14}{name:12}{size:8d}"
+                f"{encode_time * 1e6:12.2f}{decode_time * 1e6:12.2f}"
+            )
+
+    print()
+    for name, (size, seconds) in totals.items():
+        print(
+            f"{name:12} {size * args.users / 1e6:10.1f} MB for {args.users} users, "
+            f"{seconds * 1e6:6.2f} us serialization per turn"
+        )
+
+
+if __name__ == "__main__":
+    main()
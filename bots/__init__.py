@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
-from .custom_prompt_bot import CustomPromptBot
+from .custom_prompt_bot import CustomPromptBot, NUMBER_RECOGNITION
+from .number_recognition import NumberRecognition
+from .prefetch import Prefetch, Prefetcher
 
-__all__ = ["CustomPromptBot"]
+__all__ = ["CustomPromptBot", "NUMBER_RECOGNITION", "NumberRecognition", "Prefetch", "Prefetcher"]
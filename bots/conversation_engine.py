@@ -0,0 +1,183 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import inspect
+import operator
+from string import Formatter
+from typing import Callable, Dict, List
+
+from data_models import ConversationFlow, Question, UserProfile
+from metrics import stage
+
+OPERATORS = {
+    "eq": operator.eq,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+}
+
+
+class Template:
+    """A reply template parsed once into literal text and field lookups."""
+
+    __slots__ = ("text", "parts")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if spec or conversion:
+                raise ValueError(
+                    f"[Template]: format specs are not supported in '{text}'"
+                )
+            if literal:
+                self.parts.append((literal, None))
+            if field is not None:
+                self.parts.append((None, field))
+
+    def render(self, profile: UserProfile, message: str) -> str:
+        return "".join(
+            literal
+            if field is None
+            else str(message if field == "message" else getattr(profile, field))
+            for literal, field in self.parts
+        )
+
+
+class Outcome:
+    __slots__ = ("replies", "next_question")
+
+    def __init__(self, spec: dict):
+        self.replies = tuple(Template(text) for text in spec.get("replies", ()))
+        self.next_question = Question[spec["next"]] if "next" in spec else None
+
+
+class Step:
+    __slots__ = (
+        "validator", "validator_stage", "store", "outcome", "invalid", "no_value", "by_value", "ordered", "default",
+    )
+
+    def __init__(self, spec: dict, validators: Dict[str, Callable]):
+        name = spec.get("validator")
+        if name is not None and name not in validators:
+            raise ValueError(f"[Step]: unknown validator '{name}'")
+        self.validator = validators[name] if name is not None else None
+        self.validator_stage = f"validate_{name}"
+        self.store = spec.get("store")
+        self.outcome = Outcome(spec) if self.validator is None else None
+        self.invalid = Outcome(spec["invalid"]) if "invalid" in spec else None
+        self.no_value = Outcome(spec["no_value"]) if "no_value" in spec else None
+
+        self.by_value = {}
+        self.ordered = []
+        self.default = None
+        for branch in spec.get("branches", ()):
+            outcome = Outcome(branch)
+            when = branch.get("when")
+            if when is None:
+                self.default = outcome
+            elif when[0] == "eq":
+                self.by_value[when[1]] = outcome
+            elif when[0] in OPERATORS:
+                self.ordered.append((OPERATORS[when[0]], when[1], outcome))
+            else:
+                raise ValueError(f"[Step]: unknown condition '{when[0]}'")
+
+    async def resolve(self, profile: UserProfile, user_input: str, turn_state: dict = None):
+        if self.validator is None:
+            return self.outcome, None
+
+        with stage(turn_state, self.validator_stage):
+            result = self.validator(user_input)
+            if inspect.isawaitable(result):
+                result = await result
+        if not result.is_valid:
+            return self.invalid, result.message
+        if not result.value:
+            return self.no_value, result.message
+
+        value = result.value
+        if self.store:
+            setattr(profile, self.store, value)
+        outcome = self.by_value.get(value)
+        if outcome is None:
+            for compare, operand, candidate in self.ordered:
+                if compare(value, operand):
+                    outcome = candidate
+                    break
+            else:
+                outcome = self.default
+        return outcome, result.message
+
+
+class ConversationEngine:
+    """
+    Runs the declarative dialog (see bots.dialog) as a transition table keyed
+    by the last question asked. Steps, conditions and templates are compiled
+    once, so a turn is one dict lookup, one validator call and the rendering
+    of its replies.
+
+    `validators` maps the validator names used in the dialog to callables
+    taking the user's input and returning a ValidationResult (or an
+    awaitable of one).
+    """
+
+    def __init__(self, dialog: dict, validators: Dict[str, Callable]):
+        self.steps = {
+            Question[name]: Step(spec, validators) for name, spec in dialog.items()
+        }
+        missing = [question.name for question in Question if question not in self.steps]
+        if missing:
+            raise ValueError(f"[ConversationEngine]: no step for {', '.join(missing)}")
+
+    async def run(
+        self,
+        flow: ConversationFlow,
+        profile: UserProfile,
+        user_input: str,
+        turn_state: dict = None,
+    ) -> List[str]:
+        """
+        Advances `flow` and `profile` by one user message and returns the
+        replies. Validator time is recorded against `turn_state` if given.
+        """
+        outcome, message = await self.steps[flow.last_question_asked].resolve(
+            profile, user_input, turn_state
+        )
+        if outcome is None:
+            return []
+        if outcome.next_question is not None:
+            flow.last_question_asked = outcome.next_question
+        return [template.render(profile, message) for template in outcome.replies]
+
+
+class ReplayMismatch(AssertionError):
+    pass
+
+
+async def replay(
+    engine: ConversationEngine,
+    script: list,
+    flow: ConversationFlow = None,
+    profile: UserProfile = None,
+) -> list:
+    """
+    Plays a scripted conversation through `engine` without an adapter.
+
+    Each script entry is a user message, or a (message, expected replies)
+    pair. Returns the transcript as (message, replies) pairs and raises
+    ReplayMismatch at the first turn whose replies differ from the expected.
+    """
+    flow = flow if flow is not None else ConversationFlow()
+    profile = profile if profile is not None else UserProfile()
+    transcript = []
+    for entry in script:
+        message, expected = (entry, None) if isinstance(entry, str) else entry
+        replies = await engine.run(flow, profile, message)
+        transcript.append((message, replies))
+        if expected is not None and list(expected) != replies:
+            raise ReplayMismatch(
+                f"turn {len(transcript)} '{message}': expected {list(expected)}, got {replies}"
+            )
+    return transcript
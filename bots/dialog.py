@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+The conversation the bot runs, declared as data and compiled once by
+ConversationEngine.
+
+Each step is keyed by the question last asked and may have:
+
+- "validator": name of the validator to run on the user's input
+- "store": UserProfile field the validated value is saved to
+- "invalid": outcome when the input does not validate
+- "no_value": outcome when it validates but carries no value
+- "branches": outcomes for a value, picked by "when" ([op, operand], with op
+  one of eq, lt, le, gt, ge) or unconditionally when "when" is missing;
+  eq branches are looked up first, the others are tried in order
+- "replies"/"next": outcome of a step without a validator
+
+An outcome sends its "replies" templates, which may use {message} (the
+validator's message) and any UserProfile field, and moves to "next"; without
+"next" the same question stays open.
+"""
+
+ASK_MOOD = "{name}今天过的怎么样？能跟我聊聊吗？是开心的一天吗？"
+ASK_GIFT = "{name}喜欢收礼物吗？有没有收到过来自家人印象特别深刻的礼物？"
+
+DIALOG = {
+    # ask for name
+    "NONE": {
+        "replies": ["Hi, 本来想问你好吗？但是还是算了吧。", "要不我来直接学习你吧😉", "我该怎么称呼你呀？"],
+        "next": "NAME",
+    },
+    # validate name then ask for age
+    "NAME": {
+        "validator": "name",
+        "store": "name",
+        "invalid": {"replies": ["{message}"]},
+        "branches": [
+            {
+                "replies": ["很高兴认识你， {name}。", "你可以叫我iki，或者任何你想叫的名字~", "你今年几岁了?"],
+                "next": "AGE",
+            },
+        ],
+    },
+    # validate age then ask for mood
+    "AGE": {
+        "validator": "age",
+        "store": "age",
+        "invalid": {"replies": ["{message}"]},
+        "no_value": {"replies": ["{message}", ASK_MOOD], "next": "MOOD"},
+        "branches": [
+            {
+                "when": ["lt", 30],
+                "replies": ["{age}岁的年纪，你的人生才刚刚开始呢。", ASK_MOOD],
+                "next": "MOOD",
+            },
+            {
+                "replies": ["{age}岁的年纪，你一定有很多故事可以和我分享吧。", ASK_MOOD],
+                "next": "MOOD",
+            },
+        ],
+    },
+    # validate mood then ask about a relative
+    "MOOD": {
+        "validator": "mood",
+        "store": "mood",
+        "invalid": {
+            "replies": ["{message}", "不如我们换个话题吧。", ASK_GIFT],
+            "next": "RELATIVE",
+        },
+        "branches": [
+            {
+                "when": ["eq", "positive"],
+                "replies": [
+                    "哇！听上去真好。很高兴能听到你这么说😊。",
+                    "一般有些什么事会让你觉得开心呢？",
+                    "对我来说，收到礼物最让我开心了！",
+                    "你有没有收到过来自家人印象特别深的礼物？",
+                ],
+                "next": "RELATIVE",
+            },
+            {
+                "when": ["eq", "negative"],
+                "replies": [
+                    "真遗憾听到你这么说😔。",
+                    "不过有我在，我会一直陪着你的😌。",
+                    "不如让我们说说开心的事吧！",
+                    "对我来说，收到礼物最让我开心了！",
+                    "{name}喜欢收礼物吗？有没有收到过来自家人印象特别深的礼物？",
+                ],
+                "next": "RELATIVE",
+            },
+            {
+                "when": ["eq", "neutral"],
+                "replies": ["我明白，有时候确实也不知道怎么描述自己的心情。不如我们换个话题吧！", ASK_GIFT],
+                "next": "RELATIVE",
+            },
+        ],
+    },
+    # validate relative and wrap it up
+    "RELATIVE": {
+        "validator": "relative",
+        "store": "relative",
+        "invalid": {"replies": ["{message}"]},
+        "branches": [
+            {
+                "replies": ["哇，这一定是你很珍惜的礼物吧！", "{relative}是你最喜欢的家人吗？"],
+                "next": "NONE",
+            },
+        ],
+    },
+}
@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import re
+import threading
+from functools import lru_cache
+
+# recognizers_number.Culture.Chinese; the package itself is imported with the model.
+CHINESE = "zh-cn"
+
+HANZI_DIGITS = {
+    "零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4,
+    "五": 5, "六": 6, "七": 7, "八": 8, "九": 9,
+}
+HANZI_UNITS = {"十": 10, "百": 100}
+
+# Plain answers to "你今年几岁了?": "25", "二十五", "我今年三十岁了".
+SIMPLE_NUMBER = re.compile(
+    r"^(?:我)?(?:今年)?(?:已经)?(\d{1,3}|[零〇一二两三四五六七八九十百]{1,5})"
+    r"(?:周岁|岁)?(?:了|啦)?[。.!！~]?$"
+)
+
+
+def parse_hanzi_number(text: str):
+    # Integer value of a simple hanzi numeral below one thousand, or None.
+    total = 0
+    digit = None
+    last_unit = None
+    for char in text:
+        if char in HANZI_DIGITS:
+            if digit is not None:
+                return None
+            digit = HANZI_DIGITS[char]
+        elif char in HANZI_UNITS:
+            unit = HANZI_UNITS[char]
+            if last_unit is not None and unit >= last_unit:
+                return None
+            total += (1 if digit is None else digit) * unit
+            digit = None
+            last_unit = unit
+        else:
+            return None
+    return total + (digit or 0)
+
+
+class NumberRecognition:
+    """
+    Reusable number recognition for the AGE step.
+
+    The recognizers-text model is built once, under a lock, (see `warm_up`)
+    instead of on every call, plain digit and simple hanzi answers skip it entirely, and
+    results for repeated inputs are memoized. `recognize` returns the
+    resolved values as strings, in the order the recognizer found them.
+    """
+
+    def __init__(self, culture: str = CHINESE, cache_size: int = 1024):
+        self.culture = culture
+        self._model = None
+        self._lock = threading.Lock()
+        self.recognize = lru_cache(maxsize=cache_size)(self._recognize)
+
+    @property
+    def model(self):
+        if self._model is None:
+            # A turn during a background warm-up waits for that model instead
+            # of building a second one.
+            with self._lock:
+                if self._model is None:
+                    from recognizers_number import NumberRecognizer
+
+                    self._model = NumberRecognizer(self.culture).get_number_model()
+        return self._model
+
+    def warm_up(self):
+        # Parsing once compiles the extractor's regexes ahead of the first turn.
+        self.model.parse("一百二十三")
+
+    def _recognize(self, text: str) -> tuple:
+        match = SIMPLE_NUMBER.match(text.strip())
+        if match:
+            value = match.group(1)
+            number = int(value) if value.isdigit() else parse_hanzi_number(value)
+            if number is not None:
+                return (str(number),)
+
+        return tuple(
+            result.resolution["value"]
+            for result in self.model.parse(text)
+            if result.resolution and "value" in result.resolution
+        )
@@ -0,0 +1,98 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from typing import List, Union
+
+from botbuilder.core import MessageFactory, TurnContext
+from botbuilder.schema import Activity, ActivityTypes, DeliveryModes
+
+
+# Activities the adapter handles without a Bot Connector request.
+LOCAL_ACTIVITY_TYPES = ("delay", "invokeResponse", ActivityTypes.trace)
+
+
+class OutboundStats:
+    """
+    Counts replies and the Bot Connector requests that carried them. The
+    adapter POSTs each message or typing activity on its own, except for
+    expectReplies turns, whose replies go back inline in the response.
+    """
+
+    def __init__(self):
+        self.turns = 0
+        self.activities = 0
+        self.connector_requests = 0
+
+    @property
+    def connector_requests_per_turn(self) -> float:
+        return self.connector_requests / self.turns if self.turns else 0.0
+
+    @property
+    def activities_per_turn(self) -> float:
+        return self.activities / self.turns if self.turns else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "turns": self.turns,
+            "activities": self.activities,
+            "connector_requests": self.connector_requests,
+            "connector_requests_per_turn": self.connector_requests_per_turn,
+            "activities_per_turn": self.activities_per_turn,
+        }
+
+
+class OutboundBuffer:
+    """
+    Collects a turn's replies and sends them with a single `send_activities`
+    call, instead of awaiting one `send_activity` per message.
+
+    With `pacing_ms` set, a typing indicator and a delay of that many
+    milliseconds go between consecutive messages so they do not arrive all
+    at once. When the incoming activity asked for expectReplies, the adapter
+    returns everything inline in the /api/messages response.
+    """
+
+    def __init__(
+        self,
+        turn_context: TurnContext,
+        pacing_ms: int = 0,
+        stats: OutboundStats = None,
+    ):
+        self.turn_context = turn_context
+        self.pacing_ms = pacing_ms
+        self.stats = stats
+        self.activities: List[Activity] = []
+
+    def add(self, activity_or_text: Union[Activity, str]):
+        if isinstance(activity_or_text, str):
+            activity_or_text = MessageFactory.text(activity_or_text)
+        self.activities.append(activity_or_text)
+
+    @property
+    def _inline(self) -> bool:
+        return self.turn_context.activity.delivery_mode == DeliveryModes.expect_replies
+
+    def _paced(self) -> List[Activity]:
+        # Inline (expectReplies) responses arrive all at once anyway.
+        if not self.pacing_ms or self._inline or len(self.activities) < 2:
+            return self.activities
+        paced = [self.activities[0]]
+        for activity in self.activities[1:]:
+            paced.append(Activity(type=ActivityTypes.typing))
+            paced.append(Activity(type="delay", value=self.pacing_ms))
+            paced.append(activity)
+        return paced
+
+    async def flush(self):
+        if self.stats is not None:
+            self.stats.turns += 1
+            self.stats.activities += len(self.activities)
+        activities = self._paced()
+        self.activities = []
+        if not activities:
+            return []
+        if self.stats is not None and not self._inline:
+            self.stats.connector_requests += sum(
+                1 for activity in activities if activity.type not in LOCAL_ACTIVITY_TYPES
+            )
+        return await self.turn_context.send_activities(activities)
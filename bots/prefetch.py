@@ -0,0 +1,115 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from botbuilder.schema import Activity, ActivityTypes
+
+from data_models import Question
+from metrics import REGISTRY
+
+
+class Prefetch:
+    """An analysis started for a message before its turn began."""
+
+    KEY = "prefetch.Prefetch"
+
+    __slots__ = ("question", "start", "end", "task")
+
+    def __init__(self, question: Question, task: asyncio.Future):
+        self.question = question
+        self.start = time.perf_counter()
+        self.end = None
+        self.task = task
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Future):
+        self.end = time.perf_counter()
+        if not task.cancelled():
+            # The validator's own call reports any failure.
+            task.exception()
+
+    def saved(self, asked: float) -> float:
+        # How much of the analysis had already run when the validator asked.
+        end = self.end if self.end is not None and self.end < asked else asked
+        return max(0.0, end - self.start)
+
+
+class Prefetcher:
+    """
+    Starts the analysis a conversation's next message will need as soon as
+    that message is parsed, so it overlaps queueing, auth and state loading.
+
+    The flow is deterministic: after a turn leaves a conversation at MOOD (or
+    RELATIVE) its next message goes to senti() (or ner()). `expect` remembers
+    that per conversation, for the most recent `max_conversations`. The
+    prefetched result lands in the analysis cache, where the validator's own
+    call finds it, in flight or done. Typing and conversationUpdate activities
+    only warm the connection to the analysis service.
+    """
+
+    def __init__(self, analyses: dict, warm_connection=None, max_conversations: int = 10000):
+        self.analyses = analyses
+        self.warm_connection = warm_connection
+        self.max_conversations = max_conversations
+        self._expected = OrderedDict()
+
+    @staticmethod
+    def key(activity: Activity):
+        if activity.conversation is None:
+            return None
+        return (activity.channel_id, activity.conversation.id)
+
+    def expect(self, activity: Activity, question: Question):
+        key = self.key(activity)
+        if key is None:
+            return
+        if question in self.analyses:
+            self._expected[key] = question
+            self._expected.move_to_end(key)
+            while len(self._expected) > self.max_conversations:
+                self._expected.popitem(last=False)
+        else:
+            self._expected.pop(key, None)
+
+    def warm(self, key, activity_type: str):
+        # The user is typing an answer the service will have to analyze, or a
+        # conversation is starting: get a connection ready.
+        if self.warm_connection is None:
+            return
+        if activity_type == ActivityTypes.conversation_update or (
+            activity_type == ActivityTypes.typing and key in self._expected
+        ):
+            asyncio.ensure_future(self.warm_connection())
+
+    def start(self, activity: Activity):
+        """Returns the Prefetch started for `activity`, or None."""
+        key = self.key(activity)
+        if activity.type != ActivityTypes.message:
+            self.warm(key, activity.type)
+            return None
+
+        question = self._expected.get(key) if key is not None else None
+        if question is None or not activity.text:
+            return None
+        text = activity.text.strip()
+        if not text:
+            return None
+        return Prefetch(question, asyncio.ensure_future(self.analyses[question](text)))
+
+    @staticmethod
+    def report(prefetch: Prefetch, question: Question, asked: float):
+        # `question` is what the turn actually asked about, `asked` when.
+        if prefetch.question != question:
+            REGISTRY.increment("bot_prefetch_total", outcome="wasted")
+            return
+        REGISTRY.increment("bot_prefetch_total", outcome="used")
+        REGISTRY.observe("bot_prefetch_saved_seconds", prefetch.saved(asked))
+
+
+REGISTRY.describe(
+    "bot_prefetch_saved_seconds",
+    "Per turn, how long a prefetched analysis had been running when its validator asked for it.",
+)
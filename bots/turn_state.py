@@ -0,0 +1,135 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import time
+from typing import Callable, List
+
+from botbuilder.core import BotState, TurnContext
+from botbuilder.core.bot_state import CachedBotState
+
+
+class TurnStateStats:
+    def __init__(self):
+        self.turns = 0
+        self.reads = 0
+        self.writes = 0
+        self.skipped_writes = 0
+        self.conflicts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def calls_per_turn(self) -> float:
+        return (self.reads + self.writes) / self.turns if self.turns else 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.turns if self.turns else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "turns": self.turns,
+            "reads": self.reads,
+            "writes": self.writes,
+            "skipped_writes": self.skipped_writes,
+            "conflicts": self.conflicts,
+            "calls_per_turn": self.calls_per_turn,
+            "mean_seconds": self.mean_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+
+def _fields(value: object):
+    # Cheap snapshot of a state property for change detection.
+    slots = getattr(type(value), "__slots__", None)
+    if slots is not None:
+        return tuple(getattr(value, name, None) for name in slots)
+    if hasattr(value, "__dict__"):
+        return tuple(sorted(vars(value).items()))
+    return value
+
+
+class TurnStateUnit:
+    """
+    Loads every state scope of a turn with one storage read and commits the
+    scopes that changed with one storage write, skipping the write when
+    nothing changed.
+
+    The loaded state is also placed in each BotState's turn cache, so
+    accessors, `save_changes` and `delete` keep working on it.
+    """
+
+    def __init__(self, scopes: List[BotState], stats: TurnStateStats = None):
+        self.scopes = scopes
+        self.stats = stats if stats is not None else TurnStateStats()
+        # All scopes of this bot share one store; BotState keeps it private.
+        self.storage = scopes[0]._storage
+
+    async def load(self, turn_context: TurnContext) -> "TurnState":
+        keys = [scope.get_storage_key(turn_context) for scope in self.scopes]
+        start = time.perf_counter()
+        items = await self.storage.read(keys)
+        elapsed = time.perf_counter() - start
+
+        for scope, key in zip(self.scopes, keys):
+            # pylint: disable=protected-access
+            turn_context.turn_state[scope._context_service_key] = CachedBotState(
+                items.get(key)
+            )
+        return TurnState(self, turn_context, keys, elapsed)
+
+
+class TurnState:
+    def __init__(
+        self, unit: TurnStateUnit, turn_context: TurnContext, keys: List[str], elapsed: float
+    ):
+        self.unit = unit
+        self.turn_context = turn_context
+        self.keys = keys
+        self.reads = 1
+        self.writes = 0
+        self.elapsed = elapsed
+        self._snapshots = {}
+        self._created = set()
+
+    def get(self, scope: BotState, name: str, factory: Callable) -> object:
+        """Returns property `name` of `scope`, creating it with `factory` if missing."""
+        state = scope.get(self.turn_context)
+        value = state.get(name)
+        if value is None:
+            value = factory()
+            state[name] = value
+            self._created.add(scope)
+        self._snapshots[(scope, name)] = (value, _fields(value))
+        return value
+
+    def is_changed(self, scope: BotState) -> bool:
+        if scope in self._created:
+            return True
+        return any(
+            _fields(value) != snapshot
+            for (owner, _), (value, snapshot) in self._snapshots.items()
+            if owner is scope
+        )
+
+    async def commit(self):
+        changes = {
+            key: scope.get(self.turn_context)
+            for scope, key in zip(self.unit.scopes, self.keys)
+            if self.is_changed(scope)
+        }
+
+        stats = self.unit.stats
+        if changes:
+            start = time.perf_counter()
+            await self.unit.storage.write(changes)
+            self.elapsed += time.perf_counter() - start
+            self.writes = 1
+        else:
+            stats.skipped_writes += 1
+
+        stats.turns += 1
+        stats.reads += self.reads
+        stats.writes += self.writes
+        stats.total_seconds += self.elapsed
+        stats.max_seconds = max(stats.max_seconds, self.elapsed)
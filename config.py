@@ -10,6 +10,98 @@ import os
 class DefaultConfig:
     """ Bot Configuration """
 
-    PORT = 3978
+    PORT = int(os.environ.get("Port", "3978"))
+    HOST = os.environ.get("Host", "localhost")
+    # Worker processes started by server.py; more than 1 needs a shared StateStorage.
+    WORKERS = int(os.environ.get("Workers", "1"))
+    # Seconds in-flight turns get to finish after SIGTERM.
+    SHUTDOWN_TIMEOUT = float(os.environ.get("ShutdownTimeout", "30"))
+    BACKLOG = int(os.environ.get("Backlog", "1024"))
+    # "blocking": warm up before the listening socket accepts; "background":
+    # accept at once and warm up behind /readyz (app.py only, server.py workers
+    # always block).
+    STARTUP_WARM_UP = os.environ.get("StartupWarmUp", "blocking").lower()
+    # Larger /api/messages bodies are refused with 413.
+    MAX_REQUEST_BYTES = int(os.environ.get("MaxRequestBytes", str(256 * 1024)))
+
     APP_ID = os.environ.get("MicrosoftAppId", "330aa505-71bf-4e8e-8eb9-8954f3ec7cdd")
     APP_PASSWORD = os.environ.get("MicrosoftAppPassword", "AtLeastSixteenCharacters_0")
+
+    # Text analytics (sentiment / entity recognition)
+    ANALYSIS_ENDPOINT = os.environ.get(
+        "AnalysisEndpoint", "https://iki-sentiment.cognitiveservices.azure.com/"
+    )
+    ANALYSIS_KEY = os.environ.get("AnalysisKey", "3133eaeecd32496284c47454e9b3fd1e")
+    # Seconds a single analysis call may take, retries included, before the
+    # fallback value is used; each attempt gets at most AnalysisAttemptTimeout.
+    ANALYSIS_TIMEOUT = float(os.environ.get("AnalysisTimeout", "3.0"))
+    ANALYSIS_ATTEMPT_TIMEOUT = float(os.environ.get("AnalysisAttemptTimeout", "1.0"))
+    ANALYSIS_CONNECT_TIMEOUT = float(os.environ.get("AnalysisConnectTimeout", "0.5"))
+    ANALYSIS_KEEPALIVE = float(os.environ.get("AnalysisKeepalive", "60"))
+    # Timeouts, connection errors, 408/429 and 5xx are retried after a jittered
+    # exponential backoff (or the service's Retry-After, if longer).
+    ANALYSIS_RETRIES = int(os.environ.get("AnalysisRetries", "2"))
+    ANALYSIS_BACKOFF_BASE = float(os.environ.get("AnalysisBackoffBaseMs", "100")) / 1000
+    ANALYSIS_BACKOFF_MAX = float(os.environ.get("AnalysisBackoffMaxMs", "1000")) / 1000
+    # After this many failed calls in a row the service is skipped, and turns
+    # use the local analyzer, for AnalysisBreakerReset seconds.
+    ANALYSIS_BREAKER_THRESHOLD = int(os.environ.get("AnalysisBreakerThreshold", "5"))
+    ANALYSIS_BREAKER_RESET = float(os.environ.get("AnalysisBreakerReset", "30"))
+    # Upper bound on analysis calls in flight at once across all conversations.
+    ANALYSIS_MAX_CONCURRENCY = int(os.environ.get("AnalysisMaxConcurrency", "32"))
+    # Concurrent senti()/ner() calls are coalesced into multi-document requests.
+    # The service caps documents per request (5 for entity recognition in v3.0).
+    ANALYSIS_BATCH_WINDOW = float(os.environ.get("AnalysisBatchWindowMs", "5")) / 1000
+    ANALYSIS_BATCH_SIZE = int(os.environ.get("AnalysisBatchSize", "5"))
+    # senti()/ner() results are cached per normalized text. Set AnalysisCachePath
+    # to a SQLite file to share the cache across workers and restarts.
+    ANALYSIS_CACHE_SIZE = int(os.environ.get("AnalysisCacheSize", "4096"))
+    ANALYSIS_CACHE_TTL = float(os.environ.get("AnalysisCacheTtl", "86400"))
+    ANALYSIS_CACHE_PATH = os.environ.get("AnalysisCachePath", "")
+    # Answers from the in-process lexicon analyzer at or above this confidence
+    # skip the remote service. Above 1.0 disables the local fast path.
+    ANALYSIS_LOCAL_MIN_CONFIDENCE = float(os.environ.get("AnalysisLocalMinConfidence", "0.8"))
+
+    # User / conversation state: memory (bounded), unbounded, sqlite or redis.
+    STATE_STORAGE = os.environ.get("StateStorage", "memory")
+    STATE_SQLITE_PATH = os.environ.get("StateSqlitePath", "bot_state.db")
+    STATE_REDIS_URL = os.environ.get("StateRedisUrl", "redis://localhost:6379/0")
+    STATE_POOL_SIZE = int(os.environ.get("StatePoolSize", "4"))
+    # Seconds of inactivity before a conversation's state expires (0 = never).
+    STATE_CONVERSATION_TTL = float(os.environ.get("StateConversationTtl", "604800"))
+    STATE_USER_TTL = float(os.environ.get("StateUserTtl", "0"))
+    # Seconds between deletions of expired SQLite records (0 = never).
+    STATE_PURGE_INTERVAL = float(os.environ.get("StatePurgeInterval", "300"))
+    # Times a turn is re-run on fresh state after another worker saved the same
+    # conversation first.
+    STATE_CONFLICT_RETRIES = int(os.environ.get("StateConflictRetries", "2"))
+    # Bounded memory store: LRU eviction past these caps (entries 0 = no cap),
+    # idle records swept every StateSweepInterval seconds. With StateColdPath
+    # set, user profiles idle for StateUserIdle seconds or evicted move to
+    # that SQLite file instead of being dropped.
+    STATE_MEMORY_MAX_BYTES = int(os.environ.get("StateMemoryMaxBytes", str(64 * 1024 * 1024)))
+    STATE_MEMORY_MAX_ENTRIES = int(os.environ.get("StateMemoryMaxEntries", "0"))
+    STATE_SWEEP_INTERVAL = float(os.environ.get("StateSweepInterval", "60"))
+    STATE_COLD_PATH = os.environ.get("StateColdPath", "")
+    STATE_USER_IDLE = float(os.environ.get("StateUserIdle", "3600"))
+
+    # Milliseconds of typing indicator between the messages of one reply (0 = off).
+    REPLY_PACING_MS = int(os.environ.get("ReplyPacingMs", "0"))
+
+    # Turns of one conversation run in order; other conversations run in
+    # parallel up to the concurrency limit and queue behind it. Requests past
+    # the queue (or past the per-conversation backlog) get 503/429 with Retry-After.
+    SCHEDULER_MAX_CONCURRENCY = int(os.environ.get("SchedulerMaxConcurrency", "64"))
+    SCHEDULER_MAX_QUEUE = int(os.environ.get("SchedulerMaxQueue", "256"))
+    SCHEDULER_MAX_PER_CONVERSATION = int(os.environ.get("SchedulerMaxPerConversation", "8"))
+    SCHEDULER_RETRY_AFTER = int(os.environ.get("SchedulerRetryAfter", "1"))
+
+    # Start MOOD/RELATIVE analysis as soon as the scheduler admits a message, and
+    # warm the analysis connection on typing / conversationUpdate activities.
+    PREFETCH = os.environ.get("Prefetch", "1").lower() not in ("0", "false", "no")
+    PREFETCH_MAX_CONVERSATIONS = int(os.environ.get("PrefetchMaxConversations", "10000"))
+
+    # Turns slower than this are logged with their per-stage breakdown (0 = off).
+    METRICS_SLOW_TURN_MS = float(os.environ.get("MetricsSlowTurnMs", "1000"))
+    # Stack sampling interval for slow-turn profiles (0 = sampler off).
+    METRICS_SAMPLE_INTERVAL_MS = float(os.environ.get("MetricsSampleIntervalMs", "0"))
@@ -0,0 +1,198 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def normalize_text(text: str) -> str:
+    # Full-width/half-width variants, surrounding blanks and repeated spaces
+    # should not produce separate cache entries.
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split()).lower()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.merged = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_errors = 0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class SqliteCacheBackend:
+    """
+    Shared second-level cache in a local SQLite file, so entries survive
+    restarts and are visible to every worker on the machine. All queries run
+    on one background thread to keep the event loop free.
+    """
+
+    def __init__(self, path: str):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def _get(self, key: str):
+        row = self._connection.execute(
+            "SELECT value, expires FROM analysis_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] < time.time():
+            self._connection.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+            self._connection.commit()
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _set(self, key: str, value: dict, expires: float):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO analysis_cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires),
+        )
+        self._connection.commit()
+
+    async def get(self, key: str):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, self._get, key)
+
+    async def set(self, key: str, value: dict, expires: float):
+        await asyncio.get_event_loop().run_in_executor(
+            self._executor, self._set, key, value, expires
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._connection.close()
+
+
+class AnalysisCache:
+    """
+    Bounded LRU cache with a TTL for senti()/ner() results, keyed on the
+    analysis kind, language and normalized text.
+
+    Concurrent lookups for a key that is already being computed wait for that
+    computation instead of starting another one; if its turn is cancelled, they
+    start over. `compute` returning None means the result should not be cached
+    (for example the service failed). A failing backend counts as a miss.
+    """
+
+    def __init__(self, max_size: int, ttl: float, backend: SqliteCacheBackend = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self.stats = CacheStats()
+
+        self._entries = OrderedDict()
+        self._in_flight = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(kind: str, language: str, text: str) -> str:
+        return f"{kind}:{language}:{normalize_text(text)}"
+
+    async def get_or_compute(self, kind: str, language: str, text: str, compute):
+        key = self.make_key(kind, language, text)
+
+        while True:
+            value = self._get_local(key)
+            if value is not None:
+                self.stats.hits += 1
+                return value
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            self.stats.merged += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only the owner's turn was cancelled, not ours: look again.
+                if not pending.cancelled():
+                    raise
+
+        future = asyncio.get_event_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await self._load(key, text, compute)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _load(self, key: str, text: str, compute):
+        if self.backend is not None:
+            try:
+                stored = await self.backend.get(key)
+            except sqlite3.Error as error:
+                self._backend_failed("read", error)
+                stored = None
+            if stored is not None:
+                self.stats.backend_hits += 1
+                value, expires = stored
+                self._put_local(key, value, expires)
+                return value
+
+        self.stats.misses += 1
+        value = await compute(text)
+        if value is not None:
+            expires = time.time() + self.ttl
+            self._put_local(key, value, expires)
+            if self.backend is not None:
+                try:
+                    await self.backend.set(key, value, expires)
+                except sqlite3.Error as error:
+                    self._backend_failed("write", error)
+        return value
+
+    def _backend_failed(self, operation: str, error: Exception):
+        # For example "database is locked" while another worker writes.
+        self.stats.backend_errors += 1
+        print(f"[AnalysisCache] backend {operation} failed: {error}", file=sys.stderr)
+
+    def _get_local(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < time.time():
+            del self._entries[key]
+            self.stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_local(self, key: str, value: dict, expires: float):
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
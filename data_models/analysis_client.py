@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+The process's one Text Analytics client.
+
+The Azure SDK is imported when the client is first built (at warm-up or on
+the first MOOD/RELATIVE turn that misses the local analyzer and the cache),
+not when `bots` is imported, so it stays off the cold-start path. Calls share
+one keep-alive aiohttp connection pool.
+"""
+
+import asyncio
+import time
+
+from config import DefaultConfig
+
+CONFIG = DefaultConfig()
+
+_client = None
+_session = None
+_warmed_at = 0.0
+
+
+def get_client():
+    # One keep-alive connection pool serves every call. The SDK's own retry
+    # policy is off: RetryPolicy in resilience.py owns retries and deadlines.
+    global _client, _session
+    if _client is None:
+        import aiohttp
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.pipeline.transport import AioHttpTransport
+        from azure.ai.textanalytics.aio import TextAnalyticsClient
+
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=CONFIG.ANALYSIS_MAX_CONCURRENCY,
+                keepalive_timeout=CONFIG.ANALYSIS_KEEPALIVE,
+            )
+        )
+        transport = AioHttpTransport(
+            session=_session,
+            session_owner=False,
+            connection_timeout=CONFIG.ANALYSIS_CONNECT_TIMEOUT,
+            read_timeout=CONFIG.ANALYSIS_ATTEMPT_TIMEOUT,
+        )
+        _client = TextAnalyticsClient(
+            endpoint=CONFIG.ANALYSIS_ENDPOINT,
+            credential=AzureKeyCredential(CONFIG.ANALYSIS_KEY),
+            transport=transport,
+            retry_total=0,
+        )
+    return _client
+
+
+async def warm_connection():
+    # Opens (or refreshes) a pooled keep-alive connection to the endpoint, so
+    # the next call skips the TCP and TLS handshakes. At most once per half
+    # keep-alive period; any answer, even an error status, will do.
+    global _warmed_at
+    now = time.monotonic()
+    if now - _warmed_at < CONFIG.ANALYSIS_KEEPALIVE / 2:
+        return
+    _warmed_at = now
+    get_client()
+    import aiohttp
+
+    try:
+        async with _session.head(
+            CONFIG.ANALYSIS_ENDPOINT,
+            timeout=aiohttp.ClientTimeout(total=CONFIG.ANALYSIS_ATTEMPT_TIMEOUT),
+        ) as response:
+            await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+
+
+async def close_client():
+    global _client, _session
+    if _client is not None:
+        await _client.close()
+        _client = None
+    if _session is not None:
+        await _session.close()
+        _session = None
@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import time
+
+
+class CoalescerStats:
+    def __init__(self):
+        self.batches = 0
+        self.documents = 0
+        self.max_batch_size = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.errors = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.documents / self.batches if self.batches else 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.documents if self.documents else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "documents": self.documents,
+            "mean_batch_size": self.mean_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "mean_wait_seconds": self.mean_wait,
+            "max_wait_seconds": self.max_wait,
+            "errors": self.errors,
+        }
+
+
+class RequestCoalescer:
+    """
+    Collects single-document analysis requests from concurrent turns and sends
+    them to the service as one multi-document call.
+
+    `operation` receives a list of text analytics documents and returns the
+    service's per-document results (or None if the call failed). Each caller of
+    `submit` gets back the result whose id matches its document, error
+    documents included, or None when the whole batch failed.
+    """
+
+    def __init__(self, operation, language: str, window: float, max_batch_size: int):
+        if max_batch_size < 1:
+            raise ValueError(
+                "[RequestCoalescer]: max_batch_size must be at least 1"
+            )
+        self.operation = operation
+        self.language = language
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.stats = CoalescerStats()
+
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, text: str):
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            asyncio.ensure_future(self._send(batch))
+
+    async def _send(self, batch):
+        now = time.perf_counter()
+        stats = self.stats
+        stats.batches += 1
+        stats.documents += len(batch)
+        stats.max_batch_size = max(stats.max_batch_size, len(batch))
+        for _, _, submitted in batch:
+            wait = now - submitted
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+
+        documents = [
+            {"language": self.language, "id": str(index), "text": text}
+            for index, (text, _, _) in enumerate(batch)
+        ]
+        try:
+            results = await self.operation(documents)
+        except Exception as error:  # pylint: disable=broad-except
+            stats.errors += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        by_id = {doc.id: doc for doc in results} if results is not None else {}
+        if results is None:
+            stats.errors += 1
+        for index, (_, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result(by_id.get(str(index)))
@@ -13,7 +13,16 @@ class Question(Enum):
 
 
 class ConversationFlow:
+    __slots__ = ("last_question_asked",)
+
     def __init__(
         self, last_question_asked: Question = Question.NONE,
     ):
         self.last_question_asked = last_question_asked
+
+    def to_record(self) -> list:
+        return [self.last_question_asked.value]
+
+    @classmethod
+    def from_record(cls, record: list) -> "ConversationFlow":
+        return cls(Question(record[0]))
@@ -0,0 +1,238 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from collections import deque
+
+POSITIVE_WORDS = [
+    "开心", "高兴", "快乐", "愉快", "幸福", "满足", "兴奋", "舒服", "放松", "轻松",
+    "不错", "很好", "挺好", "真好", "棒", "爽", "开心死了", "美好", "顺利", "喜欢",
+    "享受", "充实", "感动", "温暖", "期待", "哈哈", "嘿嘿", "好极了", "完美", "得意",
+]
+NEGATIVE_WORDS = [
+    "难过", "伤心", "痛苦", "生气", "愤怒", "烦", "烦躁", "郁闷", "沮丧", "失望",
+    "焦虑", "紧张", "害怕", "担心", "孤独", "寂寞", "无聊", "累", "疲惫", "辛苦",
+    "糟糕", "糟", "差", "惨", "倒霉", "不好", "崩溃", "委屈", "难受", "心累",
+    "压力大", "哭", "讨厌", "烦死了", "不爽", "不开心", "emo",
+]
+NEUTRAL_WORDS = [
+    "还好", "还行", "一般", "一般般", "普通", "马马虎虎", "凑合", "平常", "正常",
+    "老样子", "就那样", "没什么特别", "不知道", "说不上来", "差不多", "还可以",
+    "不好说",
+]
+# Each negator in the same clause shortly before a sentiment word flips it.
+# Negators are matched as words, so compounds that merely contain a negator
+# character ("特别开心", "未来很美好") do not count as negations.
+NEGATORS = ["不", "没", "没有", "别", "未", "不是", "并非"]
+NEGATOR_COMPOUNDS = [
+    "特别", "区别", "分别", "差别", "告别", "个别", "级别", "类别", "性别", "别人", "别的",
+    "未来", "未知", "不久", "不少", "不过", "不管", "不仅", "不但", "差不多", "不得不",
+]
+# Negators that follow the sentiment word they flip: "开心不起来".
+TRAILING_NEGATORS = ["不起来"]
+# Idioms whose polarity the lexicon cannot read ("别提多开心了" is very happy,
+# not unhappy); answers containing them go to the service.
+AMBIGUOUS_PHRASES = ["别提多"]
+CLAUSE_BREAKS = set("，。！？；,.!?; \n~")
+NEGATION_WINDOW = 4
+
+KINSHIP_TERMS = [
+    "妈妈", "母亲", "老妈", "妈", "爸爸", "父亲", "老爸", "爸",
+    "奶奶", "爷爷", "外婆", "外公", "姥姥", "姥爷",
+    "哥哥", "姐姐", "弟弟", "妹妹", "哥", "姐", "弟", "妹",
+    "表哥", "表姐", "表弟", "表妹", "堂哥", "堂姐", "堂弟", "堂妹",
+    "叔叔", "阿姨", "舅舅", "舅妈", "姑姑", "姑父", "姨妈", "姨父", "婶婶",
+    "伯伯", "伯父", "伯母", "老公", "老婆", "丈夫", "妻子",
+    "儿子", "女儿", "孙子", "孙女", "外孙", "外孙女",
+]
+# Words that contain a kinship term without naming a relative.
+KINSHIP_COMPOUNDS = [
+    "小姐姐", "小哥哥", "小姐", "哥们", "哥儿们", "姐妹们", "兄弟", "徒弟", "师兄", "师姐",
+    "师弟", "师妹", "他妈", "你妈", "妈的", "老弟", "小弟", "大哥大",
+]
+# A one-character term ("妈", "弟") is only trusted as the whole answer.
+SHORT_KINSHIP_CONFIDENCE = 0.5
+
+
+def normalize_person(person: str) -> str:
+    # The same clean-up ner() applies to PersonType entities: "我妈妈" -> "妈妈",
+    # "妈" -> "妈妈".
+    if person[0] == '我':
+        return person[1:]
+    if len(person) == 1:
+        return person + person
+    return person
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed word list. `find` returns the
+    leftmost-longest, non-overlapping matches as (start, end, word) tuples.
+    """
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+
+        for word in words:
+            state = 0
+            for char in word:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state] = word
+
+        # Breadth-first pass to link every state to its longest proper suffix.
+        self._suffix_outputs = [[] for _ in self._goto]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            if self._output[state] is not None:
+                self._suffix_outputs[state].append(self._output[state])
+            self._suffix_outputs[state].extend(self._suffix_outputs[self._fail[state]])
+            for char, child in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0) if state else 0
+                queue.append(child)
+
+    def find(self, text: str):
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for word in self._suffix_outputs[state]:
+                matches.append((index + 1 - len(word), index + 1, word))
+
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        selected = []
+        end = 0
+        for match in matches:
+            if match[0] >= end:
+                selected.append(match)
+                end = match[1]
+        return selected
+
+
+class Analysis:
+    def __init__(self, result: dict = None, confidence: float = 0.0):
+        self.result = result if result is not None else {}
+        self.confidence = confidence
+
+
+class Analyzer:
+    """
+    In-process analyzer consulted by senti()/ner() before the remote service.
+    Results use the same shape as senti()/ner(); a confidence below
+    AnalysisLocalMinConfidence sends the text on to the service.
+    """
+
+    def senti(self, sentence: str) -> Analysis:
+        raise NotImplementedError()
+
+    def ner(self, sentence: str) -> Analysis:
+        raise NotImplementedError()
+
+
+class LexiconAnalyzer(Analyzer):
+    def __init__(
+        self,
+        positive_words=None,
+        negative_words=None,
+        neutral_words=None,
+        kinship_terms=None,
+    ):
+        self._polarity = {}
+        for words, polarity in (
+            (neutral_words or NEUTRAL_WORDS, 0),
+            (positive_words or POSITIVE_WORDS, 1),
+            (negative_words or NEGATIVE_WORDS, -1),
+        ):
+            for word in words:
+                self._polarity[word] = polarity
+        self._sentiment_matcher = KeywordMatcher(self._polarity)
+        self._negation_matcher = KeywordMatcher(
+            NEGATORS + NEGATOR_COMPOUNDS + TRAILING_NEGATORS + AMBIGUOUS_PHRASES
+        )
+        self._kinship_terms = set(kinship_terms or KINSHIP_TERMS)
+        self._kinship_matcher = KeywordMatcher(list(self._kinship_terms) + KINSHIP_COMPOUNDS)
+
+    def senti(self, sentence: str) -> Analysis:
+        text = (sentence or "").strip()
+        if not text:
+            return Analysis()
+
+        negators = []
+        trailing = set()
+        for start, end, word in self._negation_matcher.find(text):
+            if word in AMBIGUOUS_PHRASES:
+                return Analysis()
+            if word in TRAILING_NEGATORS:
+                trailing.add(start)
+            elif word in NEGATORS:
+                negators.append((start, end))
+        positive = negative = neutral = 0
+        covered = 0
+        previous_end = 0
+        for start, end, word in self._sentiment_matcher.find(text):
+            polarity = self._polarity[word]
+            if polarity:
+                window_start = max(previous_end, start - NEGATION_WINDOW)
+                for index in range(start - 1, window_start - 1, -1):
+                    if text[index] in CLAUSE_BREAKS:
+                        window_start = index + 1
+                        break
+                negations = sum(
+                    1
+                    for negator_start, negator_end in negators
+                    if negator_start >= window_start and negator_end <= start
+                )
+                negations += end in trailing
+                if negations % 2:
+                    polarity = -polarity
+            if polarity > 0:
+                positive += 1
+            elif polarity < 0:
+                negative += 1
+            else:
+                neutral += 1
+            covered += end - start
+            previous_end = end
+
+        hits = positive + negative + neutral
+        if not hits:
+            return Analysis()
+
+        if positive > negative:
+            label, agreement = "positive", (positive - negative) / (positive + negative)
+        elif negative > positive:
+            label, agreement = "negative", (negative - positive) / (positive + negative)
+        elif positive:
+            # As many positive as negative words: "mixed", let the service decide.
+            return Analysis({"sentiment": "neutral"}, 0.0)
+        else:
+            label, agreement = "neutral", 1.0
+
+        # A couple of lexicon words in a long message say little about it.
+        coverage = min(1.0, 4.0 * covered / len(text))
+        return Analysis({"sentiment": label}, agreement * coverage)
+
+    def ner(self, sentence: str) -> Analysis:
+        text = (sentence or "").strip("".join(CLAUSE_BREAKS))
+        matches = [
+            match for match in self._kinship_matcher.find(text) if match[2] in self._kinship_terms
+        ]
+        if not matches:
+            return Analysis()
+        # The remote path keeps the last PersonType entity; do the same here.
+        term = matches[-1][2]
+        confidence = 1.0
+        if len(term) == 1 and text not in (term, "我" + term):
+            confidence = SHORT_KINSHIP_CONFIDENCE
+        return Analysis({"person_type": normalize_person(term)}, confidence)
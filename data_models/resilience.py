@@ -0,0 +1,172 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Retries and a circuit breaker for calls to the analysis service.
+
+RetryPolicy gives each call a total deadline and each attempt a shorter one,
+and retries timeouts, connection errors, 408/429 and 5xx responses after a
+full-jitter exponential backoff, or after the Retry-After the service asked
+for when that is longer. A retry that could not finish before the deadline is
+not started.
+
+CircuitBreaker opens after `failure_threshold` consecutive failed calls. While
+open, `allow()` is False so callers skip the service and take their degraded
+path straight away; after `reset_timeout` one trial call is let through and
+its outcome closes or re-opens the breaker.
+"""
+
+import asyncio
+import random
+import time
+
+from azure.core.exceptions import (
+    AzureError,
+    HttpResponseError,
+    ServiceRequestError,
+    ServiceResponseError,
+)
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def retry_after(error: Exception):
+    # Seconds the service asked us to wait, or None.
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    for header, scale in (
+        ("retry-after-ms", 0.001),
+        ("x-ms-retry-after-ms", 0.001),
+        ("Retry-After", 1.0),
+    ):
+        value = headers.get(header)
+        if value:
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                # HTTP-date form; fall back to our own backoff.
+                pass
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if isinstance(error, HttpResponseError) and error.status_code is not None:
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (ServiceRequestError, ServiceResponseError))
+
+
+class RetryStats:
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        attempt_timeout: float,
+        deadline: float,
+    ):
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.stats = RetryStats()
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def run(self, attempt):
+        """
+        Returns `await attempt()`, retrying as described above. Raises the last
+        error (asyncio.TimeoutError or an AzureError) once out of retries or time.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.deadline
+        self.stats.calls += 1
+        retry = 0
+        while True:
+            self.stats.attempts += 1
+            timeout = min(self.attempt_timeout, deadline - loop.time())
+            try:
+                return await asyncio.wait_for(attempt(), timeout)
+            except (asyncio.TimeoutError, AzureError) as error:
+                if retry >= self.retries or not is_retryable(error):
+                    self.stats.failures += 1
+                    raise
+                delay = max(self.backoff(retry), retry_after(error) or 0.0)
+                # Leave room for at least a short attempt after sleeping.
+                if loop.time() + delay + 0.05 >= deadline:
+                    self.stats.failures += 1
+                    raise
+            self.stats.retries += 1
+            retry += 1
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.short_circuits = 0
+        self._changed_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = self.clock()
+        # Half-open lets one trial through per reset_timeout, so a trial that
+        # never reported back (cancelled turn) cannot wedge the breaker.
+        if now - self._changed_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._changed_at = now
+            return True
+        self.short_circuits += 1
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.OPEN:
+            return
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened += 1
+            self.state = self.OPEN
+            self._changed_at = self.clock()
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": self.opened,
+            "short_circuits": self.short_circuits,
+        }
@@ -1,45 +1,194 @@
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.textanalytics import TextAnalyticsClient
-
-endpoint = 'https://iki-sentiment.cognitiveservices.azure.com/'
-credential = AzureKeyCredential("3133eaeecd32496284c47454e9b3fd1e")
-text_analytics_client = TextAnalyticsClient(endpoint=endpoint, credential=credential)
-
-def senti(sentence):
-    sent= [
-    {
-      "language": "zh-hans",
-      "id": "1",
-      "text": sentence
-    }]
-    result = text_analytics_client.analyze_sentiment(sent)
-    s = ''.join([doc.sentiment for doc in result if not doc.is_error])
+import asyncio
+import sys
+
+from azure.core.exceptions import AzureError
+
+from config import DefaultConfig
+from metrics import REGISTRY
+
+from .analysis_client import close_client, get_client
+from .analysis_cache import AnalysisCache, SqliteCacheBackend
+from .coalescer import RequestCoalescer
+from .local_analyzer import LexiconAnalyzer, normalize_person
+from .resilience import CircuitBreaker, RetryPolicy
+
+CONFIG = DefaultConfig()
+
+LANGUAGE = "zh-hans"
+
+_semaphore = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(CONFIG.ANALYSIS_MAX_CONCURRENCY)
+    return _semaphore
+
+
+RETRY = RetryPolicy(
+    CONFIG.ANALYSIS_RETRIES,
+    CONFIG.ANALYSIS_BACKOFF_BASE,
+    CONFIG.ANALYSIS_BACKOFF_MAX,
+    CONFIG.ANALYSIS_ATTEMPT_TIMEOUT,
+    CONFIG.ANALYSIS_TIMEOUT,
+)
+BREAKER = CircuitBreaker(CONFIG.ANALYSIS_BREAKER_THRESHOLD, CONFIG.ANALYSIS_BREAKER_RESET)
+
+
+async def _call(name, operation, documents):
+    # Run one analysis call with retries and a deadline. Returns None instead
+    # of raising so a slow or failing service never takes the turn down with it.
+    async def attempt():
+        async with _get_semaphore():
+            return await operation(documents)
+
+    try:
+        result = await RETRY.run(attempt)
+    except asyncio.TimeoutError:
+        print(f"[{name}] analysis timed out", file=sys.stderr)
+    except AzureError as error:
+        print(f"[{name}] analysis failed: {error}", file=sys.stderr)
+    else:
+        BREAKER.record_success()
+        return result
+    BREAKER.record_failure()
+    return None
+
+
+async def _analyze_sentiment(documents):
+    return await _call("senti", get_client().analyze_sentiment, documents)
+
+
+async def _recognize_entities(documents):
+    return await _call("ner", get_client().recognize_entities, documents)
+
+
+SENTIMENT_BATCHER = RequestCoalescer(
+    _analyze_sentiment,
+    LANGUAGE,
+    window=CONFIG.ANALYSIS_BATCH_WINDOW,
+    max_batch_size=CONFIG.ANALYSIS_BATCH_SIZE,
+)
+ENTITY_BATCHER = RequestCoalescer(
+    _recognize_entities,
+    LANGUAGE,
+    window=CONFIG.ANALYSIS_BATCH_WINDOW,
+    max_batch_size=CONFIG.ANALYSIS_BATCH_SIZE,
+)
+
+LOCAL_ANALYZER = LexiconAnalyzer()
+
+CACHE = AnalysisCache(
+    CONFIG.ANALYSIS_CACHE_SIZE,
+    CONFIG.ANALYSIS_CACHE_TTL,
+    SqliteCacheBackend(CONFIG.ANALYSIS_CACHE_PATH) if CONFIG.ANALYSIS_CACHE_PATH else None,
+)
+
+
+def sentiment_from_docs(docs) -> dict:
+    s = ''.join([doc.sentiment for doc in docs if not doc.is_error])
     sentiment = {'sentiment': s}
     return sentiment
 
-def ner(sentence):
-    sent= [
-    {
-      "language": "zh-hans",
-      "id": "1",
-      "text": sentence
-    }]
-    results = text_analytics_client.recognize_entities(sent)
-    results = [review for review in results if not review.is_error]
+
+def relative_from_docs(docs) -> dict:
+    results = [review for review in docs if not review.is_error]
     relative = {}
     for result in results:
         for entity in result.entities:
-            if entity.category =="PersonType":
-                person = entity.text
-                if person[0] == '我':
-                    relative['person_type'] = person[1:]
-                elif len(person) == 1:
-                    relative['person_type'] = person+person
-                else:
-                    relative['person_type'] = entity.text
-            else:
-                pass
+            if entity.category == "PersonType":
+                relative['person_type'] = normalize_person(entity.text)
     return relative
 
 
+async def _remote_senti(sentence):
+    # None (service failure, or the breaker is open) is not cached, so the next
+    # turn tries again.
+    if not BREAKER.allow():
+        return None
+    doc = await SENTIMENT_BATCHER.submit(sentence)
+    if doc is None or doc.is_error:
+        return None
+    return sentiment_from_docs([doc])
+
+
+async def _remote_ner(sentence):
+    if not BREAKER.allow():
+        return None
+    doc = await ENTITY_BATCHER.submit(sentence)
+    if doc is None or doc.is_error:
+        return None
+    return relative_from_docs([doc])
+
+
+async def _analyze(kind, sentence, local, remote):
+    # Confident local answers never leave the process. Otherwise ask the
+    # service, and if it cannot answer keep whatever the local engine found so
+    # the bot still works offline.
+    if local.confidence >= CONFIG.ANALYSIS_LOCAL_MIN_CONFIDENCE:
+        REGISTRY.increment("analysis_requests_total", kind=kind, source="local")
+        return dict(local.result)
+    with REGISTRY.time("analysis_seconds", kind=kind):
+        result = await CACHE.get_or_compute(kind, LANGUAGE, sentence, remote)
+    if result is None:
+        REGISTRY.increment("analysis_requests_total", kind=kind, source="fallback")
+        return dict(local.result)
+    REGISTRY.increment("analysis_requests_total", kind=kind, source="service")
+    return dict(result)
+
+
+def _collect_metrics():
+    samples = [
+        ("analysis_cache_events_total", "counter", {"event": event}, count)
+        for event, count in CACHE.stats.as_dict().items()
+    ]
+    samples.append(("analysis_cache_entries", "gauge", {}, len(CACHE)))
+    for kind, batcher in (("sentiment", SENTIMENT_BATCHER), ("entities", ENTITY_BATCHER)):
+        stats = batcher.stats
+        labels = {"kind": kind}
+        samples.extend(
+            [
+                ("analysis_batches_total", "counter", labels, stats.batches),
+                ("analysis_batch_documents_total", "counter", labels, stats.documents),
+                ("analysis_batch_errors_total", "counter", labels, stats.errors),
+                ("analysis_batch_wait_seconds_total", "counter", labels, stats.total_wait),
+                ("analysis_batch_wait_seconds_max", "gauge", labels, stats.max_wait),
+            ]
+        )
+    retry = RETRY.stats
+    samples.extend(
+        [
+            ("analysis_calls_total", "counter", {}, retry.calls),
+            ("analysis_attempts_total", "counter", {}, retry.attempts),
+            ("analysis_retries_total", "counter", {}, retry.retries),
+            ("analysis_call_failures_total", "counter", {}, retry.failures),
+            ("analysis_breaker_open", "gauge", {}, int(BREAKER.state != BREAKER.CLOSED)),
+            ("analysis_breaker_opened_total", "counter", {}, BREAKER.opened),
+            ("analysis_breaker_short_circuits_total", "counter", {}, BREAKER.short_circuits),
+        ]
+    )
+    return samples
+
+
+REGISTRY.add_collector(_collect_metrics)
+
+
+async def senti(sentence):
+    return await _analyze("sentiment", sentence, LOCAL_ANALYZER.senti(sentence), _remote_senti)
+
+
+async def ner(sentence):
+    return await _analyze("entities", sentence, LOCAL_ANALYZER.ner(sentence), _remote_ner)
+
+
+def warm_up():
+    # Build the client ahead of the first MOOD/RELATIVE turn.
+    get_client()
+
 
+async def close():
+    await close_client()
+    if CACHE.backend is not None:
+        CACHE.backend.close()
+        CACHE.backend = None
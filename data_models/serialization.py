@@ -0,0 +1,59 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Compact, versioned encoding of stored state.
+
+A state record (the dict a BotState keeps per scope) is written as
+
+    [1, {"UserProfile": ["u", "小明", 25, "positive", "妈妈"]}]
+
+i.e. the format version followed by each property as a type code and its
+fields. Types without a code fall back to jsonpickle under the "j" code.
+Records written before this format (plain jsonpickle objects) still decode.
+"""
+
+import json
+
+import jsonpickle
+
+from .conversation_flow import ConversationFlow
+from .user_profile import UserProfile
+
+FORMAT_VERSION = 1
+
+# Codes are part of the stored format: never reuse or renumber one.
+TYPE_CODES = {UserProfile: "u", ConversationFlow: "f"}
+TYPES_BY_CODE = {code: cls for cls, code in TYPE_CODES.items()}
+PICKLED = "j"
+
+
+def _encode_value(value) -> list:
+    code = TYPE_CODES.get(type(value))
+    if code is not None:
+        return [code] + value.to_record()
+    return [PICKLED, jsonpickle.encode(value)]
+
+
+def _decode_value(record: list):
+    code = record[0]
+    if code == PICKLED:
+        return jsonpickle.decode(record[1])
+    return TYPES_BY_CODE[code].from_record(record[1:])
+
+
+def encode_state(state: dict) -> str:
+    properties = {name: _encode_value(value) for name, value in state.items()}
+    return json.dumps(
+        [FORMAT_VERSION, properties], ensure_ascii=False, separators=(",", ":")
+    )
+
+
+def decode_state(data: str) -> dict:
+    if data.startswith("["):
+        version, properties = json.loads(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"[decode_state]: unsupported state format version {version}")
+        return {name: _decode_value(record) for name, record in properties.items()}
+    # Legacy record written with jsonpickle.
+    return jsonpickle.decode(data)
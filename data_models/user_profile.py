@@ -3,8 +3,17 @@
 
 
 class UserProfile:
+    __slots__ = ("name", "age", "mood", "relative")
+
     def __init__(self, name: str = None, age: int = 0, mood: str = None, relative: str = None):
         self.name = name
         self.age = age
         self.mood = mood
         self.relative = relative
+
+    def to_record(self) -> list:
+        return [self.name, self.age, self.mood, self.relative]
+
+    @classmethod
+    def from_record(cls, record: list) -> "UserProfile":
+        return cls(*record)
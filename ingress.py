@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Cheap first look at /api/messages bodies.
+
+Bodies are decoded with orjson when it is installed (the stdlib json module
+otherwise). `is_trivial` then reads only `type` from the decoded dict. It
+picks out the activities CustomPromptBot does nothing with (typing,
+conversationUpdate, reactions, events, ...), so messages() can answer them
+without building the msrest Activity object graph, authenticating or
+touching state. Messages and invokes always take the full path.
+"""
+
+import json
+
+from botbuilder.schema import ActivityTypes
+
+try:
+    import orjson
+
+    def loads(data: bytes):
+        return orjson.loads(data)
+
+    DECODER = "orjson"
+except ImportError:  # pragma: no cover - depends on the environment
+
+    def loads(data: bytes):
+        return json.loads(data)
+
+    DECODER = "json"
+
+# Activity types the bot handles; every other type is a no-op for it.
+HANDLED_TYPES = {ActivityTypes.message, ActivityTypes.invoke}
+
+
+def decode(data: bytes) -> dict:
+    """Decodes a request body, raising ValueError unless it is a JSON object."""
+    body = loads(data)
+    if not isinstance(body, dict):
+        raise ValueError("activity must be a JSON object")
+    return body
+
+
+def is_trivial(body: dict) -> bool:
+    activity_type = body.get("type")
+    return isinstance(activity_type, str) and activity_type not in HANDLED_TYPES
+
+
+def conversation_key(body: dict):
+    # Same key as Prefetcher.key, read straight from the body.
+    conversation = body.get("conversation")
+    if not isinstance(conversation, dict) or "id" not in conversation:
+        return None
+    return (body.get("channelId"), conversation["id"])
@@ -0,0 +1,257 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+In-process turn instrumentation, exposed in Prometheus text format on
+/metrics.
+
+Stages are timed into fixed-bucket histograms; recording one costs a
+perf_counter call, a bisect and a few dict operations, so it stays on under
+full load. Turns slower than DefaultConfig.METRICS_SLOW_TURN_MS have their
+per-stage breakdown passed to every hook added with `add_slow_turn_hook`,
+and with METRICS_SAMPLE_INTERVAL_MS set a StackSampler reports where the
+event loop spent its time while the slow turn was in flight.
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from typing import Callable, Dict, Tuple
+
+# Seconds; suited to anything from a dict lookup to a remote call.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+        self.help: Dict[str, str] = {}
+        self._collectors = []
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def describe(self, name: str, text: str):
+        self.help[name] = text
+
+    def add_collector(self, collector: Callable):
+        """
+        `collector()` is called on every scrape and returns (name, type,
+        labels dict, value) tuples, for state kept elsewhere (cache stats,
+        queue depth, ...).
+        """
+        self._collectors.append(collector)
+
+    def time(self, name: str, **labels) -> "Timer":
+        return Timer(self, name, labels)
+
+    def render(self) -> str:
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{labels} {value}")
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            header(name, "histogram")
+            inner = labels[1:-1] + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{inner}le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{inner}le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{labels} {histogram.sum}")
+            lines.append(f"{name}_count{labels} {histogram.count}")
+
+        # Samples of one metric must be contiguous, whichever collector sent them.
+        collected = [sample for collector in self._collectors for sample in collector()]
+        collected.sort(key=lambda sample: sample[0])
+        for name, kind, labels, value in collected:
+            header(name, kind)
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class Timer:
+    __slots__ = ("registry", "name", "labels", "start", "elapsed")
+
+    def __init__(self, registry: Registry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+
+
+REGISTRY = Registry()
+REGISTRY.describe("bot_turn_seconds", "Wall time of a whole /api/messages request.")
+REGISTRY.describe("bot_turn_stage_seconds", "Wall time of one stage of a turn.")
+
+_slow_turn_hooks = []
+
+
+def add_slow_turn_hook(hook: Callable):
+    """`hook(timings)` is called with the TurnTimings of every slow turn."""
+    _slow_turn_hooks.append(hook)
+
+
+def log_slow_turn(timings: "TurnTimings"):
+    stages = ", ".join(
+        f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.stages.items()
+    )
+    print(
+        f"[metrics] slow turn {timings.total * 1000:.1f}ms: {stages}", file=sys.stderr
+    )
+
+
+class TurnTimings:
+    """Per-turn stage breakdown, kept in the turn context under KEY."""
+
+    KEY = "metrics.TurnTimings"
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.total = 0.0
+
+    def stage(self, name: str) -> "StageTimer":
+        return StageTimer(self, name)
+
+    def finish(self, slow_turn_seconds: float = 0):
+        self.total = time.perf_counter() - self.start
+        REGISTRY.observe("bot_turn_seconds", self.total)
+        if slow_turn_seconds and self.total >= slow_turn_seconds:
+            REGISTRY.increment("bot_slow_turns_total")
+            for hook in _slow_turn_hooks:
+                hook(self)
+
+
+class StageTimer:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: TurnTimings, name: str):
+        self.timings = timings
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> "StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.record(time.perf_counter() - self.start)
+
+    def record(self, elapsed: float):
+        stages = self.timings.stages
+        stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        REGISTRY.observe("bot_turn_stage_seconds", elapsed, stage=self.name)
+
+
+def stage(turn_state: dict, name: str):
+    """
+    Times a stage of the current turn. Outside an instrumented turn (tests,
+    replay) only the global histogram is updated.
+    """
+    timings = turn_state.get(TurnTimings.KEY) if turn_state is not None else None
+    if timings is None:
+        return REGISTRY.time("bot_turn_stage_seconds", stage=name)
+    return timings.stage(name)
+
+
+class StackSampler:
+    """
+    Samples the event loop thread's stack every `interval` seconds from a
+    daemon thread. `hook` is a slow-turn hook that logs the most frequent
+    stacks seen between the turn's start and end; with concurrent turns these
+    include work done for other conversations in the same window.
+    """
+
+    def __init__(self, interval: float, capacity: int = 20000, depth: int = 6, top: int = 5):
+        self.interval = interval
+        self.depth = depth
+        self.top = top
+        self.samples = deque(maxlen=capacity)
+        self._thread_id = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+        thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)  # pylint: disable=protected-access
+            stack = []
+            while frame is not None and len(stack) < self.depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename}:{frame.f_lineno}({code.co_name})")
+                frame = frame.f_back
+            self.samples.append((time.perf_counter(), tuple(stack)))
+
+    def profile(self, start: float, end: float) -> Counter:
+        return Counter(stack for when, stack in list(self.samples) if start <= when <= end)
+
+    def hook(self, timings: TurnTimings):
+        stacks = self.profile(timings.start, timings.start + timings.total)
+        total = sum(stacks.values())
+        for stack, count in stacks.most_common(self.top):
+            print(
+                f"[metrics]   {count}/{total} samples: " + " <- ".join(stack),
+                file=sys.stderr,
+            )
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Offline replay: streams logged activities from a JSONL file through
+CustomPromptBot without a channel or network, and streams per-turn results
+to a JSONL output file.
+
+    python replay.py transcripts.jsonl --out results.jsonl --parallel 16
+
+Each input line is a Bot Framework activity (as logged from /api/messages).
+Missing fields are filled in so `{"conversation": {"id": "c1"}, "text": "hi"}`
+is enough. Turns of one conversation run in file order, up to --parallel
+conversations at a time; at most --window activities are held in memory, so
+multi-GB logs replay in flat memory (use StateStorage=sqlite for the state
+of many conversations, too).
+
+Each output line is one turn: conversation, text, replies, wall time and the
+per-stage timings (validate_<name>, state_load, ...). A final "summary" line,
+also printed to stderr, has throughput and per-stage totals.
+
+By default MOOD/RELATIVE answers come from the in-process lexicon analyzer;
+--analysis service sends them to the configured Text Analytics endpoint.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict
+
+from botbuilder.core import BotAdapter, TurnContext
+from botbuilder.schema import Activity, ActivityTypes, ChannelAccount, ResourceResponse
+
+from metrics import TurnTimings
+from scheduler import ConversationScheduler
+
+
+class ReplayAdapter(BotAdapter):
+    """A TestAdapter-style adapter whose replies stay with their own turn, so
+    any number of conversations can be in flight at once."""
+
+    REPLIES_KEY = "replay.Replies"
+
+    async def send_activities(self, context: TurnContext, activities):
+        replies = context.turn_state[self.REPLIES_KEY]
+        responses = []
+        for activity in activities:
+            if activity.type == ActivityTypes.message:
+                replies.append(activity.text)
+            responses.append(ResourceResponse(id=str(len(replies))))
+        return responses
+
+    async def update_activity(self, context: TurnContext, activity: Activity):
+        raise NotImplementedError()
+
+    async def delete_activity(self, context: TurnContext, reference):
+        raise NotImplementedError()
+
+    async def process(self, activity: Activity, logic) -> list:
+        context = TurnContext(self, activity)
+        replies = context.turn_state[self.REPLIES_KEY] = []
+        await self.run_pipeline(context, logic)
+        return replies
+
+
+class StageTotals:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "total_ms": self.total * 1000,
+        }
+
+
+def to_activity(body: dict) -> Activity:
+    activity = Activity().deserialize(body)
+    activity.type = activity.type or ActivityTypes.message
+    activity.channel_id = activity.channel_id or "replay"
+    if activity.conversation is None or not activity.conversation.id:
+        raise ValueError("activity has no conversation id")
+    if activity.from_property is None or not activity.from_property.id:
+        # One user per conversation unless the log says otherwise.
+        activity.from_property = ChannelAccount(id=activity.conversation.id, name="user")
+    activity.recipient = activity.recipient or ChannelAccount(id="bot", name="iki")
+    activity.service_url = activity.service_url or "https://replay.invalid"
+    return activity
+
+
+class Replay:
+    def __init__(self, bot, parallel: int, window: int, output):
+        self.bot = bot
+        self.adapter = ReplayAdapter()
+        self.output = output
+        self.window = window
+        # Never sheds load: nothing can be queued beyond the read-ahead window.
+        self.scheduler = ConversationScheduler(parallel, window, window, 0)
+        self.stages: Dict[str, StageTotals] = {}
+        self.turns = 0
+        self.errors = 0
+
+    def write(self, record: dict):
+        self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def turn(self, line_number: int, activity: Activity):
+        timings = TurnTimings()
+
+        async def logic(turn_context: TurnContext):
+            turn_context.turn_state[TurnTimings.KEY] = timings
+            await self.bot.on_turn(turn_context)
+
+        record = {
+            "line": line_number,
+            "conversation": activity.conversation.id,
+            "text": activity.text,
+        }
+        try:
+            record["replies"] = await self.scheduler.run(
+                activity.conversation.id, lambda: self.adapter.process(activity, logic)
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            self.errors += 1
+            record["error"] = f"{type(error).__name__}: {error}"
+        elapsed = time.perf_counter() - timings.start
+        self.turns += 1
+        record["ms"] = round(elapsed * 1000, 3)
+        record["stages"] = {
+            name: round(seconds * 1000, 3) for name, seconds in timings.stages.items()
+        }
+        for name, seconds in timings.stages.items():
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = StageTotals()
+            totals.add(seconds)
+        self.write(record)
+
+    async def run(self, lines) -> dict:
+        start = time.perf_counter()
+        window = asyncio.Semaphore(self.window)
+        pending = set()
+
+        def done(task):
+            pending.discard(task)
+            window.release()
+
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                activity = to_activity(json.loads(line))
+            except ValueError as error:
+                self.errors += 1
+                self.write({"line": line_number, "error": f"unreadable activity: {error}"})
+                continue
+            await window.acquire()
+            task = asyncio.ensure_future(self.turn(line_number, activity))
+            pending.add(task)
+            task.add_done_callback(done)
+
+        if pending:
+            await asyncio.wait(pending)
+        elapsed = time.perf_counter() - start
+        return {
+            "turns": self.turns,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "turns_per_second": round(self.turns / elapsed, 1) if elapsed else 0.0,
+            "stages": {name: totals.as_dict() for name, totals in sorted(self.stages.items())},
+        }
+
+
+async def replay(args) -> dict:
+    # Imported only now: configuration is read when these modules load.
+    from botbuilder.core import ConversationState, UserState
+
+    from bots import CustomPromptBot
+    from config import DefaultConfig
+    from data_models import sentiment
+    from storage import create_storage
+
+    storage = create_storage(DefaultConfig())
+    bot = CustomPromptBot(ConversationState(storage), UserState(storage))
+    output = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    lines = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        summary = await Replay(bot, args.parallel, args.window, output).run(lines)
+        output.write(json.dumps({"summary": summary}, ensure_ascii=False) + "\n")
+        return summary
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if output is not sys.stdout:
+            output.close()
+        await sentiment.close()
+        if hasattr(storage, "close"):
+            await storage.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("input", help="JSONL file of activities, or - for stdin")
+    parser.add_argument("--out", default="-", help="JSONL file for per-turn results (default stdout)")
+    parser.add_argument("--parallel", type=int, default=16, help="conversations replayed at once")
+    parser.add_argument("--window", type=int, default=256, help="activities read ahead at most")
+    parser.add_argument("--analysis", choices=("local", "service"), default="local")
+    args = parser.parse_args()
+
+    if args.analysis == "local":
+        # Every local answer counts as confident, so nothing leaves the process.
+        os.environ["AnalysisLocalMinConfidence"] = "0"
+
+    loop = asyncio.new_event_loop()
+    try:
+        summary = loop.run_until_complete(replay(args))
+    finally:
+        loop.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
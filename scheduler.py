@@ -0,0 +1,158 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Admission control in front of BOT.on_turn.
+
+Turns of one conversation run one at a time, in arrival order, so quick
+successive messages cannot race on `flow.last_question_asked` or overwrite
+each other's state. Turns of different conversations run in parallel up to
+DefaultConfig.SCHEDULER_MAX_CONCURRENCY; the rest wait in a bounded queue,
+and anything beyond it is refused with a Retry-After instead of piling up
+coroutines and outbound analysis calls.
+"""
+
+import asyncio
+import time
+from http import HTTPStatus
+
+
+class Overloaded(Exception):
+    def __init__(self, status: HTTPStatus, retry_after: int):
+        super().__init__(f"[ConversationScheduler]: {status.phrase}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class SchedulerStats:
+    def __init__(self):
+        self.turns = 0
+        self.rejected_global = 0
+        self.rejected_conversation = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.turns if self.turns else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "turns": self.turns,
+            "rejected_global": self.rejected_global,
+            "rejected_conversation": self.rejected_conversation,
+            "mean_wait_seconds": self.mean_wait,
+            "max_wait_seconds": self.max_wait,
+        }
+
+
+class _Lane:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Turns of this conversation admitted and not yet finished.
+        self.depth = 0
+
+
+class ConversationScheduler:
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        max_per_conversation: int,
+        retry_after: int,
+    ):
+        if max_concurrency < 1:
+            raise ValueError(
+                "[ConversationScheduler]: max_concurrency must be at least 1"
+            )
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_conversation = max_per_conversation
+        self.retry_after = retry_after
+        self.stats = SchedulerStats()
+
+        # Admitted turns still waiting for their conversation or a free slot.
+        self.queued = 0
+        self.running = 0
+        self._lanes = {}
+        self._semaphore = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it binds to the serving loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, key, operation, timings=None):
+        """
+        Returns `await operation()` once every earlier turn with the same `key`
+        has finished and a concurrency slot is free. A None key only takes a
+        slot. Raises Overloaded (429 for one busy conversation, 503 when the
+        whole queue is full) instead of waiting. Time spent waiting is recorded
+        as the "queue" stage of `timings`.
+        """
+        lane = None
+        if key is not None:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = _Lane()
+            if lane.depth >= self.max_per_conversation:
+                self.stats.rejected_conversation += 1
+                raise Overloaded(HTTPStatus.TOO_MANY_REQUESTS, self.retry_after)
+        if self.queued >= self.max_queue:
+            self.stats.rejected_global += 1
+            if lane is not None and not lane.depth:
+                del self._lanes[key]
+            raise Overloaded(HTTPStatus.SERVICE_UNAVAILABLE, self.retry_after)
+
+        if lane is not None:
+            lane.depth += 1
+        self.queued += 1
+        waiting = True
+        start = time.perf_counter()
+        try:
+            if lane is not None:
+                await lane.lock.acquire()
+            try:
+                async with self._get_semaphore():
+                    self.queued -= 1
+                    waiting = False
+                    self._record_wait(time.perf_counter() - start, timings)
+                    self.running += 1
+                    try:
+                        return await operation()
+                    finally:
+                        self.running -= 1
+            finally:
+                if lane is not None:
+                    lane.lock.release()
+        finally:
+            # Also reached when the request is cancelled while still queued.
+            if waiting:
+                self.queued -= 1
+            if lane is not None:
+                lane.depth -= 1
+                if not lane.depth:
+                    del self._lanes[key]
+
+    def _record_wait(self, wait: float, timings):
+        self.stats.turns += 1
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+        if timings is not None:
+            timings.stage("queue").record(wait)
+
+    def collect_metrics(self):
+        stats = self.stats
+        return [
+            ("bot_scheduler_queue_depth", "gauge", {}, self.queued),
+            ("bot_scheduler_running", "gauge", {}, self.running),
+            ("bot_scheduler_conversations", "gauge", {}, len(self._lanes)),
+            ("bot_scheduler_turns_total", "counter", {}, stats.turns),
+            ("bot_scheduler_rejected_total", "counter", {"reason": "queue_full"}, stats.rejected_global),
+            ("bot_scheduler_rejected_total", "counter", {"reason": "conversation_busy"}, stats.rejected_conversation),
+            ("bot_scheduler_wait_seconds_total", "counter", {}, stats.total_wait),
+            ("bot_scheduler_wait_seconds_max", "gauge", {}, stats.max_wait),
+        ]
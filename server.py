@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Production entry point: serves app.APP from DefaultConfig.WORKERS processes
+that share one listening socket opened by a pre-fork master.
+
+The master never imports the bot, so no storage connections, threads or
+client sessions are inherited across fork; each worker imports `app` and
+warms up before it accepts. SIGTERM/SIGINT are passed
+on to the workers, which stop accepting and finish in-flight turns for up to
+SHUTDOWN_TIMEOUT seconds. Workers that die unexpectedly are restarted.
+
+    Workers=4 StateStorage=redis python server.py
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from config import DefaultConfig
+
+CONFIG = DefaultConfig()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(CONFIG.BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket = None):
+    from aiohttp import web
+
+    import app
+
+    # Workers share one socket, so a gateway's /readyz probe cannot keep turns
+    # off a cold worker; each one warms up before it accepts.
+    app.CONFIG.STARTUP_WARM_UP = "blocking"
+    if sock is None:
+        web.run_app(
+            app.APP,
+            host=CONFIG.HOST,
+            port=CONFIG.PORT,
+            shutdown_timeout=CONFIG.SHUTDOWN_TIMEOUT,
+        )
+    else:
+        web.run_app(
+            app.APP,
+            sock=sock,
+            shutdown_timeout=CONFIG.SHUTDOWN_TIMEOUT,
+            print=None,
+        )
+
+
+class Master:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.sock = bind_socket(CONFIG.HOST, CONFIG.PORT)
+        self.context = multiprocessing.get_context("fork")
+        self.processes = []
+        self.stopping = False
+
+    def spawn(self) -> multiprocessing.Process:
+        process = self.context.Process(target=run_worker, args=(self.sock,), daemon=False)
+        process.start()
+        return process
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.processes = [self.spawn() for _ in range(self.workers)]
+        print(
+            f"======== Serving on http://{CONFIG.HOST}:{CONFIG.PORT}/ "
+            f"with {self.workers} workers ========"
+        )
+
+        while not self.stopping:
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    print(
+                        f"[server] worker {process.pid} exited with {process.exitcode}, restarting",
+                        file=sys.stderr,
+                    )
+                    self.processes[index] = self.spawn()
+            time.sleep(0.5)
+
+        self.drain()
+
+    def drain(self):
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + CONFIG.SHUTDOWN_TIMEOUT + 5
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"[server] worker {process.pid} did not drain, killing", file=sys.stderr)
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+        self.sock.close()
+
+
+def main():
+    if CONFIG.WORKERS <= 1:
+        run_worker()
+        return
+
+    # Only these stores are shared between processes.
+    if CONFIG.STATE_STORAGE.lower() not in ("sqlite", "redis"):
+        sys.exit(
+            f"[server]: Workers > 1 needs a shared state store, not '{CONFIG.STATE_STORAGE}'; "
+            "set StateStorage to sqlite or redis"
+        )
+    Master(CONFIG.WORKERS).run()
+
+
+if __name__ == "__main__":
+    main()
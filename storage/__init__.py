@@ -0,0 +1,15 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from .base import EtagConflictError, KeyValueStorage
+from .bounded_memory_storage import BoundedMemoryStorage
+from .sqlite_storage import SqliteStorage
+from .storage_factory import create_storage
+
+__all__ = [
+    "BoundedMemoryStorage",
+    "EtagConflictError",
+    "KeyValueStorage",
+    "SqliteStorage",
+    "create_storage",
+]
@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import time
+import uuid
+
+from botbuilder.core import Storage
+
+from data_models.serialization import decode_state, encode_state
+
+
+class EtagConflictError(KeyError):
+    """Raised when a write carries an eTag that no longer matches the stored one."""
+
+
+class KeyValueStorage(Storage):
+    """
+    Shared behaviour for the persistent state stores: compact encoding of
+    state dicts (see data_models.serialization), eTag generation and
+    per-scope time-to-live.
+
+    `conversation_ttl` applies to ConversationState keys and `user_ttl` to
+    UserState keys, both in seconds; 0 keeps the record until it is deleted.
+    """
+
+    def __init__(self, conversation_ttl: float = 0, user_ttl: float = 0):
+        self.conversation_ttl = conversation_ttl
+        self.user_ttl = user_ttl
+
+    def ttl_for(self, key: str) -> float:
+        if "/conversations/" in key:
+            return self.conversation_ttl
+        if "/users/" in key:
+            return self.user_ttl
+        return 0
+
+    def expires_for(self, key: str, now: float = None):
+        ttl = self.ttl_for(key)
+        if not ttl:
+            return None
+        return (now if now is not None else time.time()) + ttl
+
+    @staticmethod
+    def new_e_tag() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def e_tag_of(item) -> str:
+        if isinstance(item, dict):
+            return item.get("e_tag")
+        return getattr(item, "e_tag", None)
+
+    @staticmethod
+    def set_e_tag(item, e_tag: str):
+        # Written back into the caller's object so a second save in the same
+        # turn carries the eTag that is now stored.
+        if isinstance(item, dict):
+            item["e_tag"] = e_tag
+        else:
+            item.e_tag = e_tag
+
+    @staticmethod
+    def encode(item: dict) -> str:
+        return encode_state(
+            {key: value for key, value in item.items() if key != "e_tag"}
+        )
+
+    @staticmethod
+    def decode(data: str, e_tag: str) -> dict:
+        item = decode_state(data)
+        item["e_tag"] = e_tag
+        return item
+
+    async def close(self):
+        pass
@@ -0,0 +1,273 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+from botbuilder.core import Storage
+
+from .base import EtagConflictError, KeyValueStorage
+
+
+class BoundedStorageStats:
+    def __init__(self):
+        self.evictions = 0
+        self.expirations = 0
+        self.spilled = 0
+        self.spill_failures = 0
+        self.promoted = 0
+        self.sweeps = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "spilled": self.spilled,
+            "spill_failures": self.spill_failures,
+            "promoted": self.promoted,
+            "sweeps": self.sweeps,
+        }
+
+
+class _Entry:
+    __slots__ = ("data", "e_tag", "last_access", "size")
+
+    def __init__(self, data: str, e_tag: str, last_access: float, size: int):
+        self.data = data
+        self.e_tag = e_tag
+        self.last_access = last_access
+        self.size = size
+
+
+class BoundedMemoryStorage(KeyValueStorage):
+    """
+    In-process state store whose memory use stays flat.
+
+    Records are kept in compact encoded form in LRU order. A write that takes
+    the store past `max_bytes` or `max_entries` evicts the least recently
+    used records. A sweeper task, started on first use, runs every
+    `sweep_interval` seconds: it drops conversations idle for longer than
+    `conversation_ttl`, and user profiles idle for longer than `user_ttl`.
+    It also moves profiles idle for longer than `user_idle` to `cold_storage`.
+
+    With a `cold_storage` (any Storage, usually a SqliteStorage), evicted
+    user profiles are moved there instead of being dropped and are promoted
+    back into memory on their next read. Conversations are never moved to disk.
+    Profiles that cold storage fails to take stay in memory.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entries: int = 0,
+        conversation_ttl: float = 0,
+        user_ttl: float = 0,
+        user_idle: float = 0,
+        sweep_interval: float = 60,
+        cold_storage: Storage = None,
+    ):
+        super(BoundedMemoryStorage, self).__init__(conversation_ttl, user_ttl)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.user_idle = user_idle
+        self.sweep_interval = sweep_interval
+        self.cold_storage = cold_storage
+        self.stats = BoundedStorageStats()
+        self.bytes = 0
+
+        self._entries = OrderedDict()
+        self._conversations = 0
+        # Records on their way to cold storage, still served from here.
+        self._spilling = {}
+        self._sweeper = None
+
+    @staticmethod
+    def is_user_key(key: str) -> bool:
+        return "/users/" in key
+
+    def _ensure_sweeper(self):
+        if self._sweeper is None and self.sweep_interval:
+            self._sweeper = asyncio.ensure_future(self._sweep_forever())
+
+    def _put(self, key: str, data: str, e_tag: str, now: float):
+        self._remove(key)
+        entry = _Entry(data, e_tag, now, sys.getsizeof(key) + sys.getsizeof(data))
+        self._entries[key] = entry
+        self.bytes += entry.size
+        if "/conversations/" in key:
+            self._conversations += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+            if "/conversations/" in key:
+                self._conversations -= 1
+        return entry
+
+    async def read(self, keys: List[str]):
+        self._ensure_sweeper()
+        now = time.monotonic()
+        items = {}
+        missing = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_access = now
+                self._entries.move_to_end(key)
+                items[key] = self.decode(entry.data, entry.e_tag)
+            elif key in self._spilling:
+                entry = self._spilling[key]
+                items[key] = self.decode(entry.data, entry.e_tag)
+            else:
+                missing.append(key)
+
+        if missing and self.cold_storage is not None:
+            cold = await self.cold_storage.read(missing)
+            for key, item in cold.items():
+                # A write may have landed while the cold read was in flight;
+                # that record is newer than the cold copy.
+                entry = self._entries.get(key)
+                if entry is not None:
+                    items[key] = self.decode(entry.data, entry.e_tag)
+                    continue
+                e_tag = self.e_tag_of(item) or self.new_e_tag()
+                self._put(key, self.encode(item), e_tag, now)
+                self.set_e_tag(item, e_tag)
+                self.stats.promoted += 1
+                items[key] = item
+            if cold:
+                await self.cold_storage.delete(list(cold))
+                await self._enforce_limits()
+        return items
+
+    async def write(self, changes: Dict[str, object]):
+        if changes is None:
+            raise Exception("Changes are required when writing")
+        self._ensure_sweeper()
+        for key, change in changes.items():
+            expected = self.e_tag_of(change)
+            entry = self._entries.get(key)
+            if entry is not None and expected not in (None, "*") and expected != entry.e_tag:
+                raise EtagConflictError(
+                    f"Etag conflict on {key}: {expected} is no longer current"
+                )
+
+        now = time.monotonic()
+        for key, change in changes.items():
+            e_tag = self.new_e_tag()
+            self._put(key, self.encode(change), e_tag, now)
+            self.set_e_tag(change, e_tag)
+        await self._enforce_limits()
+
+    async def delete(self, keys: List[str]):
+        for key in keys:
+            self._remove(key)
+        if self.cold_storage is not None and keys:
+            await self.cold_storage.delete(list(keys))
+
+    async def _enforce_limits(self):
+        victims = []
+        while self._entries and (
+            self.bytes > self.max_bytes
+            or (self.max_entries and len(self._entries) > self.max_entries)
+        ):
+            key, _ = next(iter(self._entries.items()))
+            victims.append((key, self._remove(key)))
+            self.stats.evictions += 1
+        await self._spill(victims)
+
+    async def _spill(self, victims: list):
+        # User profiles go to cold storage when there is one; everything else
+        # is dropped.
+        if self.cold_storage is None:
+            return
+        changes = {}
+        for key, entry in victims:
+            if self.is_user_key(key):
+                self._spilling[key] = entry
+                changes[key] = self.decode(entry.data, "*")
+        if not changes:
+            return
+        try:
+            await self.cold_storage.write(changes)
+            self.stats.spilled += len(changes)
+        except Exception as error:  # pylint: disable=broad-except
+            # The caller's own write already succeeded; keep the profiles in
+            # memory, least recently used first, and try again next time.
+            self.stats.spill_failures += 1
+            print(f"[BoundedMemoryStorage] spill failed: {error}", file=sys.stderr)
+            for key in changes:
+                entry = self._spilling[key]
+                # Unless a newer record was written meanwhile.
+                if key not in self._entries:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key, last=False)
+                    self.bytes += entry.size
+        finally:
+            for key in changes:
+                self._spilling.pop(key, None)
+
+    async def sweep(self):
+        """Expires idle records and moves idle user profiles to cold storage."""
+        now = time.monotonic()
+        limits = [
+            limit
+            for limit in (self.conversation_ttl, self.user_ttl, self.user_idle)
+            if limit
+        ]
+        if not limits:
+            return
+        oldest_kept = now - min(limits)
+        expired, cold = [], []
+        # LRU order: stop at the first record too recent for every limit.
+        for key, entry in self._entries.items():
+            if entry.last_access > oldest_kept:
+                break
+            idle = now - entry.last_access
+            ttl = self.ttl_for(key)
+            if ttl and idle > ttl:
+                expired.append(key)
+            elif (
+                self.is_user_key(key)
+                and self.user_idle
+                and self.cold_storage is not None
+                and idle > self.user_idle
+            ):
+                cold.append(key)
+
+        for key in expired:
+            self._remove(key)
+        self.stats.expirations += len(expired)
+        await self._spill([(key, self._remove(key)) for key in cold])
+        self.stats.sweeps += 1
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"[BoundedMemoryStorage] sweep failed: {error}", file=sys.stderr)
+
+    def collect_metrics(self):
+        samples = [
+            ("bot_state_memory_conversations", "gauge", {}, self._conversations),
+            ("bot_state_memory_entries", "gauge", {}, len(self._entries)),
+            ("bot_state_memory_bytes", "gauge", {}, self.bytes),
+        ]
+        samples.extend(
+            ("bot_state_memory_events_total", "counter", {"event": event}, count)
+            for event, count in self.stats.as_dict().items()
+        )
+        return samples
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self.cold_storage is not None and hasattr(self.cold_storage, "close"):
+            await self.cold_storage.close()
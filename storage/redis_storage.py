@@ -0,0 +1,118 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from typing import Dict, List
+
+from .base import EtagConflictError, KeyValueStorage
+
+# Checks every expected eTag first and only then writes, so a batch is applied
+# all-or-nothing in one round trip.
+#   KEYS: storage keys
+#   ARGV: for each key, expected eTag ("" or "*" = unconditional), new eTag,
+#         value, ttl in seconds ("0" = no expiry)
+WRITE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    local expected = ARGV[(i - 1) * 4 + 1]
+    if expected ~= "" and expected ~= "*" then
+        if redis.call("HGET", key, "e_tag") ~= expected then
+            return i
+        end
+    end
+end
+for i, key in ipairs(KEYS) do
+    local base = (i - 1) * 4
+    redis.call("HSET", key, "e_tag", ARGV[base + 2], "value", ARGV[base + 3])
+    local ttl = tonumber(ARGV[base + 4])
+    if ttl > 0 then
+        redis.call("EXPIRE", key, ttl)
+    else
+        redis.call("PERSIST", key)
+    end
+end
+return 0
+"""
+
+
+class RedisStorage(KeyValueStorage):
+    """
+    State store for any Redis-compatible server, sharing the interface and
+    eTag semantics of `SqliteStorage`. Records are hashes of value and eTag;
+    expiry is left to the server.
+
+    Needs the optional `redis` package (redis-py 4.2 or later).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 10,
+        key_prefix: str = "iki:",
+        conversation_ttl: float = 0,
+        user_ttl: float = 0,
+    ):
+        super(RedisStorage, self).__init__(conversation_ttl, user_ttl)
+        try:
+            import redis.asyncio as redis
+        except ImportError as error:
+            raise ImportError(
+                "[RedisStorage]: the redis package is required for StateStorage=redis "
+                "(pip install 'redis>=4.2')"
+            ) from error
+
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(url, max_connections=pool_size)
+        self._write_script = self._client.register_script(WRITE_SCRIPT)
+
+    async def read(self, keys: List[str]):
+        if not keys:
+            return {}
+        keys = list(keys)
+        pipeline = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hmget(self.key_prefix + key, "value", "e_tag")
+        rows = await pipeline.execute()
+
+        items = {}
+        for key, (value, e_tag) in zip(keys, rows):
+            if value is not None:
+                items[key] = self.decode(value.decode("utf-8"), e_tag.decode("utf-8"))
+        return items
+
+    async def write(self, changes: Dict[str, object]):
+        if changes is None:
+            raise Exception("Changes are required when writing")
+        if not changes:
+            return
+
+        keys = list(changes)
+        e_tags = {key: self.new_e_tag() for key in keys}
+        args = []
+        for key in keys:
+            change = changes[key]
+            args.extend(
+                [
+                    self.e_tag_of(change) or "",
+                    e_tags[key],
+                    self.encode(change),
+                    int(self.ttl_for(key)),
+                ]
+            )
+
+        failed = await self._write_script(
+            keys=[self.key_prefix + key for key in keys], args=args
+        )
+        if failed:
+            key = keys[failed - 1]
+            raise EtagConflictError(
+                f"Etag conflict on {key}: {self.e_tag_of(changes[key])} is no longer current"
+            )
+        for key in keys:
+            self.set_e_tag(changes[key], e_tags[key])
+
+    async def delete(self, keys: List[str]):
+        if not keys:
+            return
+        await self._client.delete(*[self.key_prefix + key for key in keys])
+
+    async def close(self):
+        await self._client.close()
@@ -0,0 +1,171 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from .base import EtagConflictError, KeyValueStorage
+
+
+class SqliteStorage(KeyValueStorage):
+    """
+    File-backed state store using SQLite in WAL mode.
+
+    Queries run on a small thread pool, one connection per thread, so the
+    event loop never waits on disk. Every read or write of several keys is a
+    single query / transaction. Expired records are hidden from reads at once
+    and deleted by a purge task, started on first use, every `purge_interval`
+    seconds (0 = only when `purge_expired` is called).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = 4,
+        conversation_ttl: float = 0,
+        user_ttl: float = 0,
+        purge_interval: float = 0,
+    ):
+        super(SqliteStorage, self).__init__(conversation_ttl, user_ttl)
+        self.path = path
+        self.purge_interval = purge_interval
+        self._purger = None
+        self._executor = ThreadPoolExecutor(max_workers=pool_size)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS bot_state ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, e_tag TEXT NOT NULL, expires REAL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS bot_state_expires ON bot_state (expires)"
+        )
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    async def _run(self, function, *args):
+        return await asyncio.get_event_loop().run_in_executor(
+            self._executor, function, *args
+        )
+
+    def _read(self, keys: List[str]) -> Dict[str, object]:
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, value, e_tag FROM bot_state WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*keys, time.time()),
+        ).fetchall()
+        return {key: self.decode(value, e_tag) for key, value, e_tag in rows}
+
+    def _write(self, changes: Dict[str, object]):
+        connection = self._connection()
+        now = time.time()
+        written = {}
+        with connection:
+            for key, change in changes.items():
+                expected = self.e_tag_of(change)
+                e_tag = self.new_e_tag()
+                value = self.encode(change)
+                expires = self.expires_for(key, now)
+                if expected is None or expected == "*":
+                    connection.execute(
+                        "INSERT OR REPLACE INTO bot_state (key, value, e_tag, expires) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, value, e_tag, expires),
+                    )
+                else:
+                    updated = connection.execute(
+                        "UPDATE bot_state SET value = ?, e_tag = ?, expires = ? "
+                        "WHERE key = ? AND e_tag = ?",
+                        (value, e_tag, expires, key, expected),
+                    ).rowcount
+                    if not updated:
+                        # Raising inside the `with` block rolls the batch back.
+                        raise EtagConflictError(
+                            f"Etag conflict on {key}: {expected} is no longer current"
+                        )
+                written[key] = e_tag
+        return written
+
+    def _delete(self, keys: List[str]):
+        placeholders = ",".join("?" * len(keys))
+        connection = self._connection()
+        with connection:
+            connection.execute(f"DELETE FROM bot_state WHERE key IN ({placeholders})", keys)
+
+    def _purge_expired(self) -> int:
+        connection = self._connection()
+        with connection:
+            return connection.execute(
+                "DELETE FROM bot_state WHERE expires IS NOT NULL AND expires <= ?",
+                (time.time(),),
+            ).rowcount
+
+    def _ensure_purger(self):
+        if (
+            self._purger is None
+            and self.purge_interval
+            and (self.conversation_ttl or self.user_ttl)
+        ):
+            self._purger = asyncio.ensure_future(self._purge_forever())
+
+    async def _purge_forever(self):
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge_expired()
+            except sqlite3.Error as error:
+                print(f"[SqliteStorage] purge failed: {error}", file=sys.stderr)
+
+    async def read(self, keys: List[str]):
+        self._ensure_purger()
+        if not keys:
+            return {}
+        return await self._run(self._read, list(keys))
+
+    async def write(self, changes: Dict[str, object]):
+        if changes is None:
+            raise Exception("Changes are required when writing")
+        self._ensure_purger()
+        if not changes:
+            return
+        written = await self._run(self._write, changes)
+        for key, e_tag in written.items():
+            self.set_e_tag(changes[key], e_tag)
+
+    async def delete(self, keys: List[str]):
+        if not keys:
+            return
+        await self._run(self._delete, list(keys))
+
+    async def purge_expired(self) -> int:
+        """Removes records whose time-to-live has passed. Returns how many."""
+        return await self._run(self._purge_expired)
+
+    async def close(self):
+        if self._purger is not None:
+            self._purger.cancel()
+            self._purger = None
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
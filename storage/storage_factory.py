@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from botbuilder.core import MemoryStorage, Storage
+
+from config import DefaultConfig
+
+
+def create_storage(config: DefaultConfig) -> Storage:
+    """Builds the state store selected by `DefaultConfig.STATE_STORAGE`."""
+    backend = config.STATE_STORAGE.lower()
+
+    if backend == "memory":
+        from .bounded_memory_storage import BoundedMemoryStorage
+
+        cold_storage = None
+        if config.STATE_COLD_PATH:
+            from .sqlite_storage import SqliteStorage
+
+            cold_storage = SqliteStorage(
+                config.STATE_COLD_PATH,
+                pool_size=config.STATE_POOL_SIZE,
+                user_ttl=config.STATE_USER_TTL,
+                purge_interval=config.STATE_PURGE_INTERVAL,
+            )
+        return BoundedMemoryStorage(
+            config.STATE_MEMORY_MAX_BYTES,
+            max_entries=config.STATE_MEMORY_MAX_ENTRIES,
+            conversation_ttl=config.STATE_CONVERSATION_TTL,
+            user_ttl=config.STATE_USER_TTL,
+            user_idle=config.STATE_USER_IDLE,
+            sweep_interval=config.STATE_SWEEP_INTERVAL,
+            cold_storage=cold_storage,
+        )
+
+    if backend == "unbounded":
+        return MemoryStorage()
+
+    if backend == "sqlite":
+        from .sqlite_storage import SqliteStorage
+
+        return SqliteStorage(
+            config.STATE_SQLITE_PATH,
+            pool_size=config.STATE_POOL_SIZE,
+            conversation_ttl=config.STATE_CONVERSATION_TTL,
+            user_ttl=config.STATE_USER_TTL,
+            purge_interval=config.STATE_PURGE_INTERVAL,
+        )
+
+    if backend == "redis":
+        from .redis_storage import RedisStorage
+
+        return RedisStorage(
+            config.STATE_REDIS_URL,
+            pool_size=config.STATE_POOL_SIZE,
+            conversation_ttl=config.STATE_CONVERSATION_TTL,
+            user_ttl=config.STATE_USER_TTL,
+        )
+
+    raise ValueError(
+        f"[create_storage]: unknown StateStorage '{config.STATE_STORAGE}', "
+        "expected memory, unbounded, sqlite or redis"
+    )